@@ -1,13 +1,40 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from model import predict_travel_time
+from model import predict_travel_times, get_model_version
 from dotenv import load_dotenv
 import os
-import requests
 from typing import List, Tuple
 from datetime import datetime
-from supabase_client import supabase
-from supabase import create_client
+import supabase_client
+from supabase_client import service_pool
+from geocoding import GeocodeCache, GeocodingClient, MAPBOX_GEOCODING_URL, normalize_address
+from gazetteer import load_gazetteer
+from response_cache import SingleFlightCache
+from traffic_stream import TrafficBroadcaster, format_event
+import hashlib
+import queue
+import threading
+import time
+import numpy as np
+from prediction_writer import PredictionWriter
+import atexit
+from token_verifier import TokenVerifier
+from history import HistoryCache, encode_cursor, decode_cursor, parse_fields, compute_etag
+from inference_scheduler import InferenceScheduler
+from inference_pool import InferencePool
+from jitter import parse_jitter_mode
+from departure_sweep import departure_slots, parse_clock, summarize_sweep
+from route_segments import (
+    decode_polyline, encode_polyline, interpolate_route, split_path, road_lengths, segment_area_types,
+    score_segments, traffic_levels
+)
+from eta_grid import EtaGridStore, EtaGridJob, ETA_GRID_DIR, ETA_GRID_REFRESH_SECONDS
+from metrics import REGISTRY, CONTENT_TYPE, timed, begin_request, end_request, server_timing
+import logging
+import logging_config
+
+logging_config.configure_logging()
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app, resources={
@@ -16,17 +43,32 @@ CORS(app, resources={
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         "allow_headers": ["Content-Type", "Authorization", "X-Requested-With"],
         "supports_credentials": True,
-        "expose_headers": ["Content-Type", "Authorization"],
+        "expose_headers": ["Content-Type", "Authorization", "ETag", "X-Next-Cursor", "Server-Timing"],
         "max_age": 3600
     }
 })
 
+# Add a Server-Timing header with per-stage durations to every response
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'false').lower() in ('1', 'true', 'yes')
+
+@app.before_request
+def before_request():
+    request.environ['metrics.started'] = begin_request()
+
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', request.headers.get('Origin', '*'))
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,X-Requested-With')
     response.headers.add('Access-Control-Allow-Methods', 'GET,POST,PUT,DELETE,OPTIONS')
     response.headers.add('Access-Control-Allow-Credentials', 'true')
+    
+    started = request.environ.get('metrics.started')
+    if started is not None:
+        # Label by route pattern rather than raw path to keep the series count bounded
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        timings = end_request(started, request.method, endpoint, response.status_code)
+        if SERVER_TIMING:
+            response.headers['Server-Timing'] = server_timing(timings, time.perf_counter() - started)
     return response
 
 # Mapbox access token for geocoding
@@ -34,6 +76,169 @@ def after_request(response):
 load_dotenv()
 
 MAPBOX_ACCESS_TOKEN = os.environ.get('MAPBOX_ACCESS_TOKEN')
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 5000))
+# Departure sweeps score up to this many slots (a day at 5-minute steps) in one model call
+SWEEP_MAX_SLOTS = int(os.environ.get('SWEEP_MAX_SLOTS', 288))
+
+# Geocoding results are cached in memory and optionally in SQLite across restarts
+geocode_cache = GeocodeCache(
+    max_entries=int(os.environ.get('GEOCODE_CACHE_SIZE', 4096)),
+    ttl=int(os.environ.get('GEOCODE_CACHE_TTL', 7 * 24 * 3600)),
+    negative_ttl=int(os.environ.get('GEOCODE_NEGATIVE_TTL', 600)),
+    db_path=os.environ.get('GEOCODE_CACHE_DB')
+)
+
+# Known places are geocoded in-process and power autocomplete; Mapbox answers are added to it
+gazetteer = load_gazetteer()
+AUTOCOMPLETE_MAX_RESULTS = int(os.environ.get('AUTOCOMPLETE_MAX_RESULTS', 10))
+
+# Shared keep-alive geocoding client; MAPBOX_GEOCODING_URL can point at a local stub
+geocoder = GeocodingClient(
+    MAPBOX_ACCESS_TOKEN,
+    base_url=os.environ.get('MAPBOX_GEOCODING_URL', MAPBOX_GEOCODING_URL),
+    cache=geocode_cache,
+    timeout=(3.05, float(os.environ.get('GEOCODE_TIMEOUT', 5))),
+    max_retries=int(os.environ.get('GEOCODE_MAX_RETRIES', 2)),
+    max_workers=int(os.environ.get('GEOCODE_WORKERS', 8)),
+    gazetteer=gazetteer
+)
+
+# /api/traffic responses are shared by every client polling the same route in a time bucket
+TRAFFIC_CACHE_BUCKET_SECONDS = int(os.environ.get('TRAFFIC_CACHE_BUCKET_SECONDS', 60))
+traffic_cache = SingleFlightCache(
+    max_entries=int(os.environ.get('TRAFFIC_CACHE_SIZE', 1024)),
+    ttl=TRAFFIC_CACHE_BUCKET_SECONDS
+)
+
+# Live traffic is pushed to Server-Sent Event subscribers once per interval per route
+TRAFFIC_STREAM_INTERVAL = int(os.environ.get('TRAFFIC_STREAM_INTERVAL', 60))
+TRAFFIC_STREAM_HEARTBEAT = int(os.environ.get('TRAFFIC_STREAM_HEARTBEAT', 15))
+
+# Routes given as a polyline are split into this many segments unless ?segments= says otherwise
+TRAFFIC_SEGMENTS = int(os.environ.get('TRAFFIC_SEGMENTS', 20))
+TRAFFIC_MAX_SEGMENTS = int(os.environ.get('TRAFFIC_MAX_SEGMENTS', 200))
+TRAFFIC_MAX_POLYLINE_POINTS = int(os.environ.get('TRAFFIC_MAX_POLYLINE_POINTS', 5000))
+
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', 50))
+HISTORY_MAX_PAGE_SIZE = int(os.environ.get('HISTORY_MAX_PAGE_SIZE', 200))
+
+# Recent history pages per user, invalidated whenever that user's predictions are written
+history_cache = HistoryCache(ttl=int(os.environ.get('HISTORY_CACHE_TTL', 60)))
+
+# Prediction history is written behind the response in bulk inserts
+atexit.register(service_pool.close)
+prediction_writer = PredictionWriter(
+    service_pool.client,
+    batch_size=int(os.environ.get('HISTORY_BATCH_SIZE', 100)),
+    flush_interval=float(os.environ.get('HISTORY_FLUSH_INTERVAL', 1.0)),
+    max_queue=int(os.environ.get('HISTORY_MAX_QUEUE', 10000)),
+    on_flush=history_cache.invalidate_rows
+)
+atexit.register(prediction_writer.close)
+
+# Access tokens are checked locally when a JWT secret/JWKS is configured,
+# otherwise auth server lookups are cached until the token expires
+token_verifier = TokenVerifier(
+    lambda token: supabase_client.supabase.auth.get_user(token),
+    jwt_secret=os.environ.get('SUPABASE_JWT_SECRET'),
+    jwks_url=os.environ.get('SUPABASE_JWKS_URL'),
+    max_ttl=int(os.environ.get('AUTH_CACHE_TTL', 300))
+)
+
+# With INFERENCE_PROCESSES > 0 scoring runs in that many worker processes
+# instead of this one, so it is not limited by this process's GIL
+INFERENCE_PROCESSES = int(os.environ.get('INFERENCE_PROCESSES', 0))
+inference_pool = None
+score_trips = predict_travel_times
+if INFERENCE_PROCESSES > 0:
+    inference_pool = InferencePool(
+        INFERENCE_PROCESSES,
+        start_method=os.environ.get('INFERENCE_START_METHOD'),
+        timeout=float(os.environ.get('INFERENCE_TIMEOUT', 30)),
+        health_interval=float(os.environ.get('INFERENCE_HEALTH_INTERVAL', 10))
+    )
+    atexit.register(inference_pool.close)
+    score_trips = inference_pool.predict_travel_times
+
+# Concurrent /predict calls share one model call: rows are collected for up to
+# INFERENCE_MAX_WAIT_MS or INFERENCE_MAX_BATCH rows (1 disables batching)
+inference_scheduler = InferenceScheduler(
+    score_trips,
+    max_batch_size=int(os.environ.get('INFERENCE_MAX_BATCH', 64)),
+    max_wait=float(os.environ.get('INFERENCE_MAX_WAIT_MS', 2)) / 1000,
+    concurrency=max(INFERENCE_PROCESSES, 1)
+)
+
+# Zone-to-zone ETAs are precomputed into a memory-mapped grid by a background job
+# and served without touching the model (ETA_GRID_REFRESH_SECONDS=0 disables the job)
+ETA_GRID_MAX_PAIRS = int(os.environ.get('ETA_GRID_MAX_PAIRS', 100000))
+eta_grid_store = EtaGridStore(ETA_GRID_DIR)
+eta_grid_job = EtaGridJob(eta_grid_store, refresh_seconds=ETA_GRID_REFRESH_SECONDS)
+atexit.register(eta_grid_job.stop)
+
+# How the model is loaded at startup:
+#   background - load it and run a dummy prediction on a thread; /ready turns 200 once done
+#   eager      - the same, but before this module finishes importing
+#   lazy       - on the first request that needs it (/ready is always 200)
+MODEL_PRELOAD = os.environ.get('MODEL_PRELOAD', 'background').lower()
+WARMUP_TRIP = {
+    'start_point': 'Koramangala, Bengaluru',
+    'destination': 'Whitefield, Bengaluru',
+    'day_of_week': 'Monday',
+    'departure_time': '08:30',
+    'start_coords': (12.9352, 77.6245),
+    'dest_coords': (12.9698, 77.7500),
+    'jitter': 'off'
+}
+startup_state = {'ready': MODEL_PRELOAD == 'lazy', 'warm_seconds': None, 'error': None}
+
+def warm_up():
+    """Load the model (and start any inference workers) with a dummy prediction, then start background jobs"""
+    started = time.perf_counter()
+    try:
+        # Import the SDK and build the auth client off the request path
+        supabase_client.get_client()
+    except Exception as e:
+        logger.warning("Could not create Supabase client during warm-up: %s", e)
+    try:
+        score_trips([WARMUP_TRIP])
+        startup_state['warm_seconds'] = round(time.perf_counter() - started, 3)
+        startup_state['ready'] = True
+        logger.info("Model warmed up in %.2fs", startup_state['warm_seconds'])
+    except Exception as e:
+        startup_state['error'] = str(e)
+        logger.error("Warm-up failed: %s", e)
+    # Started afterwards so the grid build doesn't compete with the warm-up for CPU
+    eta_grid_job.start()
+
+if MODEL_PRELOAD == 'eager':
+    warm_up()
+elif MODEL_PRELOAD == 'background':
+    threading.Thread(target=warm_up, name='model-warmup', daemon=True).start()
+else:
+    eta_grid_job.start()
+
+def authenticate_request():
+    """Verify the request's bearer token and return (user, error_response)"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return None, (jsonify({"error": "No authorization token"}), 401)
+        
+    parts = auth_header.split(' ')
+    if len(parts) < 2 or not parts[1]:
+        return None, (jsonify({"error": "Invalid token"}), 401)
+        
+    try:
+        # Verify token and get user
+        with timed('auth'):
+            user = token_verifier.verify(parts[1])
+        if not user:
+            return None, (jsonify({"error": "Invalid token"}), 401)
+    except Exception as auth_error:
+        logger.error("Authentication error: %s", auth_error)
+        return None, (jsonify({"error": "Authentication failed"}), 401)
+        
+    return user, None
 
 # Authentication endpoints
 @app.route('/auth/register', methods=['POST'])
@@ -43,7 +248,7 @@ def register():
         email = data.get('email')
         password = data.get('password')
         
-        response = supabase.auth.sign_up({
+        response = supabase_client.supabase.auth.sign_up({
             "email": email,
             "password": password
         })
@@ -59,7 +264,7 @@ def login():
         email = data.get('email')
         password = data.get('password')
         
-        response = supabase.auth.sign_in_with_password({
+        response = supabase_client.supabase.auth.sign_in_with_password({
             "email": email,
             "password": password
         })
@@ -74,39 +279,19 @@ def login():
 @app.route('/auth/logout', methods=['POST'])
 def logout():
     try:
-        supabase.auth.sign_out()
+        supabase_client.supabase.auth.sign_out()
         return jsonify({"message": "Logged out successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 def get_coordinates(address: str) -> Tuple[float, float]:
     """Convert address to coordinates using Mapbox Geocoding API."""
-    try:
-        # URL encode the address
-        encoded_address = requests.utils.quote(address)
-        response = requests.get(
-            f'https://api.mapbox.com/geocoding/v5/mapbox.places/{encoded_address}.json',
-            params={
-                'access_token': MAPBOX_ACCESS_TOKEN,
-                'limit': 1,
-                'country': 'in'  # Focus on India
-            }
-        )
-        
-        if response.status_code != 200:
-            print(f"Mapbox API error: {response.status_code} - {response.text}")
-            return None, None
-            
-        data = response.json()
-        if not data.get('features') or len(data['features']) == 0:
-            print(f"No results found for address: {address}")
-            return None, None
-            
-        # Return [longitude, latitude] as per Mapbox convention
-        return data['features'][0]['center'][0], data['features'][0]['center'][1]
-    except Exception as e:
-        print(f"Error geocoding address {address}: {str(e)}")
-        return None, None
+    return geocoder.geocode(address)
+
+def to_lat_lng(coordinates):
+    """Convert a geocoder (lng, lat) result into a (lat, lng) pair, or None if not found"""
+    lng, lat = coordinates
+    return (lat, lng) if lat is not None and lng is not None else None
 
 def get_traffic_level(predicted_time: float, typical_time: float) -> str:
     """Determine traffic level based on predicted vs typical travel time."""
@@ -126,6 +311,143 @@ def get_current_day_time():
     current_time = now.strftime('%H:%M')
     return day_of_week, current_time
 
+def compute_traffic(start, destination, path=None, segments=None):
+    """Compute the /api/traffic payload and status code for a route, optionally along decoded polyline points"""
+    if path is not None:
+        # The route's own endpoints stand in for the geocoded addresses
+        return traffic_payload(start, destination, None, None, path, segments)
+    # Get coordinates for start and destination concurrently
+    with timed('geocode'):
+        start_location, dest_location = geocoder.geocode_many([start, destination])
+    return traffic_payload(start, destination, start_location, dest_location, segments=segments)
+
+def parse_traffic_options(polyline, segments):
+    """Validate the optional polyline and segments query parameters
+
+    Returns (path, segments, error): the polyline decoded to (lat, lng)
+    points, or None without one, and error is None when they are usable.
+    """
+    path = None
+    if polyline:
+        try:
+            path = decode_polyline(polyline)
+        except ValueError as e:
+            return None, None, str(e)
+        if not 2 <= len(path) <= TRAFFIC_MAX_POLYLINE_POINTS:
+            return None, None, f'polyline must have between 2 and {TRAFFIC_MAX_POLYLINE_POINTS} points'
+        if np.any(np.abs(path[:, 0]) > 90) or np.any(np.abs(path[:, 1]) > 180):
+            return None, None, 'Invalid polyline'
+    if segments is not None:
+        try:
+            segments = int(segments)
+        except ValueError:
+            return None, None, 'segments must be an integer'
+        if not 1 <= segments <= TRAFFIC_MAX_SEGMENTS:
+            return None, None, f'segments must be between 1 and {TRAFFIC_MAX_SEGMENTS}'
+    return path, segments, None
+
+def traffic_payload(start, destination, start_location, dest_location, path=None, segments=None):
+    """Build the /api/traffic payload from geocoded (lng, lat) locations or a (lat, lng) route path
+
+    Without a path or a segment count the route is a single segment, in
+    the original route_segments shape. Otherwise it is split into segments
+    that are all scored in one model call, and returned as an encoded
+    polyline with one array per segment attribute.
+    """
+    if path is None:
+        (start_lng, start_lat), (dest_lng, dest_lat) = start_location, dest_location
+        
+        if not all([start_lat, start_lng, dest_lat, dest_lng]):
+            return {
+                'error': 'Could not find coordinates for one or both locations',
+                'details': {
+                    'start_found': bool(start_lat and start_lng),
+                    'destination_found': bool(dest_lat and dest_lng)
+                }
+            }, 400
+        points, boundaries, lengths = interpolate_route((start_lat, start_lng), (dest_lat, dest_lng), segments or 1)
+    else:
+        points = np.asarray(path, dtype=float)
+        boundaries, lengths = split_path(points, segments or TRAFFIC_SEGMENTS)
+    distances = road_lengths(points, lengths)
+    area_types = segment_area_types(points, boundaries)
+        
+    # Get current day and time
+    day_of_week, current_time = get_current_day_time()
+    
+    # Current and typical (off-peak) times for every segment and the whole route
+    with timed('inference'):
+        scored = score_segments(day_of_week, int(current_time[:2]), distances, area_types)
+    prediction, typical_time = scored['route_minutes'], scored['typical_route_minutes']
+    distance = float(distances.sum())
+    
+    if path is not None or segments is not None:
+        minutes, typical_minutes = scored['minutes'], scored['typical_minutes']
+        return {
+            'polyline': encode_polyline(points),
+            'segments': {
+                'count': len(distances),
+                # Index of each segment's first polyline point; it ends where the next one starts
+                'start_index': boundaries[:-1].tolist(),
+                'distance_km': np.round(distances, 3).tolist(),
+                'area_type': area_types,
+                'predicted_minutes': np.round(minutes, 2).tolist(),
+                'typical_minutes': np.round(typical_minutes, 2).tolist(),
+                'speed': np.round(distances / minutes * 60, 1).tolist(),
+                'typical_speed': np.round(distances / typical_minutes * 60, 1).tolist(),
+                'traffic_level': traffic_levels(minutes, typical_minutes).tolist()
+            },
+            'distance_km': round(distance, 2),
+            'predicted_time': int(round(prediction)),
+            'typical_time': int(round(typical_time)),
+            'traffic_level': get_traffic_level(prediction, typical_time),
+            'current_time': current_time,
+            'day_of_week': day_of_week
+        }, 200
+    
+    # Determine traffic level based on predicted time
+    now = datetime.now()
+    current_hour = now.hour
+    is_peak_hour = (current_hour >= 7 and current_hour <= 10) or (current_hour >= 17 and current_hour <= 20)
+    is_weekend = now.weekday() >= 5  # Saturday or Sunday
+    
+    # Use predicted time to determine traffic level
+    if is_peak_hour and prediction > typical_time * 1.3:  # 30% more than typical time during peak
+        traffic_level = 'peak'  # Red
+    elif is_weekend and prediction > typical_time * 1.2:  # 20% more than typical time on weekends
+        traffic_level = 'normal'  # Yellow
+    else:
+        traffic_level = 'light'  # Green
+    
+    # Return traffic data
+    return {
+        'route_segments': [
+            {
+                'start_point': [start_lat, start_lng],
+                'end_point': [dest_lat, dest_lng],
+                'traffic_level': traffic_level,
+                'speed': round(distance / prediction * 60, 1),
+                'typical_speed': round(distance / typical_time * 60, 1),
+                'current_time': current_time,
+                'day_of_week': day_of_week
+            }
+        ]
+    }, 200
+
+def traffic_cache_key(start, destination, path=None, segments=None):
+    """Cache key for a route and its segmentation in the current time bucket"""
+    time_bucket = int(time.time() // TRAFFIC_CACHE_BUCKET_SECONDS)
+    route = hashlib.sha1(np.ascontiguousarray(path, dtype=float).tobytes()).hexdigest() if path is not None else None
+    return normalize_address(start), normalize_address(destination), route, segments, time_bucket
+
+def get_cached_traffic(start, destination, path=None, segments=None):
+    """Return (payload, status) for a route, computed at most once per time bucket"""
+    return traffic_cache.get_or_compute(
+        traffic_cache_key(start, destination, path, segments),
+        lambda: compute_traffic(start, destination, path, segments),
+        should_cache=lambda result: result[1] == 200
+    )
+
 @app.route('/api/traffic', methods=['GET'])
 def get_traffic_data():
     try:
@@ -134,182 +456,423 @@ def get_traffic_data():
         
         if not start or not destination:
             return jsonify({'error': 'Missing start or destination'}), 400
+        
+        path, segments, error = parse_traffic_options(request.args.get('polyline'), request.args.get('segments'))
+        if error:
+            return jsonify({'error': error}), 400
             
-        # Get coordinates for start and destination
-        start_lng, start_lat = get_coordinates(start)
-        dest_lng, dest_lat = get_coordinates(destination)
+        payload, status = get_cached_traffic(start, destination, path, segments)
+        return jsonify(payload), status
         
-        if not all([start_lat, start_lng, dest_lat, dest_lng]):
-            return jsonify({
-                'error': 'Could not find coordinates for one or both locations',
-                'details': {
-                    'start_found': bool(start_lat and start_lng),
-                    'destination_found': bool(dest_lat and dest_lng)
-                }
-            }), 400
+    except Exception as e:
+        logger.error("Error in get_traffic_data: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+traffic_broadcaster = TrafficBroadcaster(get_cached_traffic, interval=TRAFFIC_STREAM_INTERVAL)
+
+@app.route('/api/traffic/stream', methods=['GET'])
+def stream_traffic_data():
+    start = request.args.get('start')
+    destination = request.args.get('destination')
+    
+    if not start or not destination:
+        return jsonify({'error': 'Missing start or destination'}), 400
+        
+    key, updates = traffic_broadcaster.subscribe(start, destination)
+    
+    def events():
+        try:
+            # Send the current state right away, then whatever the broadcaster pushes
+            try:
+                yield format_event(*get_cached_traffic(start, destination))
+            except Exception as e:
+                logger.error("Error in stream_traffic_data: %s", e)
+                yield format_event({'error': str(e)}, 500)
+                
+            while True:
+                try:
+                    yield format_event(*updates.get(timeout=TRAFFIC_STREAM_HEARTBEAT))
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            traffic_broadcaster.unsubscribe(key, updates)
             
-        # Get current day and time
-        day_of_week, current_time = get_current_day_time()
-        
-        # Get typical travel time (you might want to calculate this based on historical data)
-        typical_time = 30  # Example typical time in minutes
-        
-        # Get predicted travel time using current time
-        prediction = predict_travel_time(
-            start_point=start,
-            destination=destination,
-            day_of_week=day_of_week,
-            departure_time=current_time
-        )
-        
-        # Determine traffic level based on predicted time
-        now = datetime.now()
-        current_hour = now.hour
-        is_peak_hour = (current_hour >= 7 and current_hour <= 10) or (current_hour >= 17 and current_hour <= 20)
-        is_weekend = now.weekday() >= 5  # Saturday or Sunday
-        
-        # Use predicted time to determine traffic level
-        if is_peak_hour and prediction > typical_time * 1.3:  # 30% more than typical time during peak
-            traffic_level = 'peak'  # Red
-        elif is_weekend and prediction > typical_time * 1.2:  # 20% more than typical time on weekends
-            traffic_level = 'normal'  # Yellow
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def parse_point(value):
+    """(lat, lng) from a 'lat,lng' string, raising ValueError if malformed"""
+    try:
+        lat, lng = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid point {value!r} (expected lat,lng)")
+    return lat, lng
+
+def eta_grid_bucket(args):
+    """(day_of_week, hour) from request args, defaulting to now"""
+    day_of_week, current_time = get_current_day_time()
+    return args.get('day_of_week') or day_of_week, args.get('hour', current_time.split(':')[0])
+
+@app.route('/api/places/autocomplete', methods=['GET'])
+def autocomplete_places():
+    query = request.args.get('q', '').strip()
+    if len(query) < 2:
+        return jsonify({'error': 'Query must be at least 2 characters'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 5)), 1), AUTOCOMPLETE_MAX_RESULTS)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+        
+    return jsonify({'query': query, 'results': gazetteer.autocomplete(query, limit)})
+
+@app.route('/api/eta-grid', methods=['GET'])
+def get_eta_grid():
+    grid = eta_grid_store.current()
+    return jsonify({
+        'grid': grid.meta if grid is not None else None,
+        'job': eta_grid_job.stats()
+    })
+
+@app.route('/api/eta-grid/lookup', methods=['GET', 'POST'])
+def lookup_eta_grid():
+    grid = eta_grid_store.current()
+    if grid is None:
+        return jsonify({'error': 'ETA grid is not built yet'}), 503
+        
+    try:
+        if request.method == 'GET':
+            origins, destinations = [parse_point(request.args.get('origin'))], [parse_point(request.args.get('destination'))]
+            day_of_week, hour = eta_grid_bucket(request.args)
         else:
-            traffic_level = 'light'  # Green
+            data = request.get_json()
+            pairs = data.get('pairs') if isinstance(data, dict) else None
+            if not pairs or not isinstance(pairs, list):
+                return jsonify({'error': 'No pairs provided'}), 400
+            if len(pairs) > ETA_GRID_MAX_PAIRS:
+                return jsonify({'error': f'Too many pairs (max {ETA_GRID_MAX_PAIRS})'}), 400
+            points = np.asarray(pairs, dtype=float)
+            if points.ndim != 2 or points.shape[1] != 4:
+                raise ValueError("Each pair must be [origin_lat, origin_lng, destination_lat, destination_lng]")
+            origins, destinations = points[:, :2], points[:, 2:]
+            day_of_week, hour = eta_grid_bucket(data)
+            
+        predicted = grid.lookup(origins, destinations, day_of_week, hour)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
         
-        # Return traffic data
-        return jsonify({
-            'route_segments': [
-                {
-                    'start_point': [start_lat, start_lng],
-                    'end_point': [dest_lat, dest_lng],
-                    'traffic_level': traffic_level,
-                    'speed': 60,  # Example speed in km/h
-                    'typical_speed': 60,  # Example typical speed
-                    'current_time': current_time,
-                    'day_of_week': day_of_week
-                }
-            ]
-        })
+    if request.method == 'GET':
+        return jsonify({'predicted_time': predicted[0], 'day_of_week': day_of_week, 'hour': int(hour)})
+    return jsonify({'predicted_times': predicted, 'count': len(predicted), 'day_of_week': day_of_week, 'hour': int(hour)})
+
+@app.route('/api/eta-grid/tile', methods=['GET'])
+def get_eta_grid_tile():
+    grid = eta_grid_store.current()
+    if grid is None:
+        return jsonify({'error': 'ETA grid is not built yet'}), 503
         
-    except Exception as e:
-        print(f"Error in get_traffic_data: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    try:
+        day_of_week, hour = eta_grid_bucket(request.args)
+        cell, minutes = grid.tile(parse_point(request.args.get('origin')), day_of_week, hour)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    if minutes is None:
+        return jsonify({'error': 'Origin is outside the ETA grid'}), 404
+        
+    # Minutes from the origin zone to every zone, row-major from the south-west corner
+    return jsonify({
+        'origin_cell': cell,
+        'bbox': grid.meta['bbox'],
+        'rows': grid.meta['rows'],
+        'cols': grid.meta['cols'],
+        'day_of_week': day_of_week,
+        'hour': int(hour),
+        'predicted_times': minutes.tolist()
+    })
+
+def parse_prediction_input(data):
+    """Extract the /predict fields, returning (trip, jitter_mode, error_message)"""
+    if not data:
+        return None, None, "No data provided"
+        
+    trip = {
+        'start_point': data.get('start_point'),
+        'destination': data.get('destination'),
+        'day_of_week': data.get('day_of_week'),
+        'departure_time': data.get('departure_time')
+    }
+    if not all(trip.values()):
+        return None, None, "Missing required fields"
+    for field in ('start_point', 'destination'):
+        if not isinstance(trip[field], str):
+            return None, None, f"{field} must be a string"
+        
+    try:
+        parse_clock(trip['departure_time'])
+        jitter = parse_jitter_mode(data.get('jitter'))
+    except ValueError as e:
+        return None, None, str(e)
+        
+    return trip, jitter, None
+
+@timed('record')
+def record_prediction(user_id, trip, prediction):
+    """Queue a prediction for the background history writer"""
+    prediction_writer.submit({
+        'user_id': user_id,
+        **trip,
+        'predicted_time': prediction,
+        'created_at': datetime.now().isoformat()
+    })
+    history_cache.invalidate(user_id)
 
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
-        # Get auth token from header
-        auth_header = request.headers.get('Authorization')
-        if not auth_header:
-            return jsonify({"error": "No authorization token"}), 401
+        user, auth_error = authenticate_request()
+        if auth_error:
+            return auth_error
             
-        token = auth_header.split(' ')[1]
+        trip, jitter, input_error = parse_prediction_input(request.get_json())
+        if input_error:
+            return jsonify({"error": input_error}), 400
+            
+        # Geocode both endpoints so the distance comes from real coordinates
+        with timed('geocode'):
+            start_coords, dest_coords = [to_lat_lng(c) for c in geocoder.geocode_many([trip['start_point'], trip['destination']])]
         
-        try:
-            # Verify token and get user
-            user = supabase.auth.get_user(token)
-            if not user:
-                return jsonify({"error": "Invalid token"}), 401
-        except Exception as auth_error:
-            print(f"Authentication error: {str(auth_error)}")
-            return jsonify({"error": "Authentication failed"}), 401
+        # Get prediction
+        with timed('inference'):
+            prediction = inference_scheduler.predict({
+                **trip, 'start_coords': start_coords, 'dest_coords': dest_coords, 'jitter': jitter
+            })
+        
+        record_prediction(user.user.id, trip, prediction)
             
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
+        return jsonify({'predicted_time': prediction, **trip})
+        
+    except Exception as e:
+        logger.error("Prediction error: %s", e)
+        return jsonify({"error": "Failed to process prediction"}), 500
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    try:
+        user, auth_error = authenticate_request()
+        if auth_error:
+            return auth_error
+            
+        data = request.get_json(silent=True)
+        trips = data.get('trips') if isinstance(data, dict) else None
+        if not trips or not isinstance(trips, list):
+            return jsonify({"error": "No trips provided"}), 400
             
-        start_point = data.get('start_point')
-        destination = data.get('destination')
-        day_of_week = data.get('day_of_week')
-        departure_time = data.get('departure_time')
+        if len(trips) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Too many trips (max {MAX_BATCH_SIZE})"}), 400
+            
+        required_fields = ['start_point', 'destination', 'day_of_week', 'departure_time']
+        for index, trip in enumerate(trips):
+            if not isinstance(trip, dict) or not all(trip.get(field) for field in required_fields):
+                return jsonify({"error": f"Missing required fields in trip {index}"}), 400
+            for field in ('start_point', 'destination'):
+                if not isinstance(trip[field], str):
+                    return jsonify({"error": f"{field} must be a string in trip {index}"}), 400
+            try:
+                parse_clock(trip['departure_time'])
+            except ValueError as e:
+                return jsonify({"error": f"{e} in trip {index}"}), 400
+                
+        # A top-level jitter mode applies to trips that don't set their own
+        try:
+            default_jitter = parse_jitter_mode(data.get('jitter'))
+            trips = [{**trip, 'jitter': parse_jitter_mode(trip.get('jitter')) or default_jitter} for trip in trips]
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+                
+        # Geocode addresses of trips that didn't supply (lat, lng) coordinates
+        addresses = [trip[field] for trip in trips
+                     for field, coords_field in (('start_point', 'start_coords'), ('destination', 'dest_coords'))
+                     if not trip.get(coords_field)]
+        with timed('geocode'):
+            located = dict(zip(addresses, (to_lat_lng(c) for c in geocoder.geocode_many(addresses))))
+        trips = [{
+            **trip,
+            'start_coords': trip.get('start_coords') or located.get(trip['start_point']),
+            'dest_coords': trip.get('dest_coords') or located.get(trip['destination'])
+        } for trip in trips]
         
-        if not all([start_point, destination, day_of_week, departure_time]):
+        # Score all trips in one model call
+        with timed('inference'):
+            predictions = score_trips(trips)
+        
+        return jsonify({
+            'predictions': [
+                {
+                    'predicted_time': prediction,
+                    'start_point': trip['start_point'],
+                    'destination': trip['destination'],
+                    'day_of_week': trip['day_of_week'],
+                    'departure_time': trip['departure_time']
+                }
+                for trip, prediction in zip(trips, predictions)
+            ],
+            'count': len(predictions)
+        })
+        
+    except Exception as e:
+        logger.error("Batch prediction error: %s", e)
+        return jsonify({"error": "Failed to process batch prediction"}), 500
+
+@app.route('/predict/sweep', methods=['POST'])
+def predict_sweep():
+    try:
+        user, auth_error = authenticate_request()
+        if auth_error:
+            return auth_error
+            
+        data = request.get_json()
+        if not isinstance(data, dict) or not all(data.get(field) for field in ('start_point', 'destination', 'day_of_week')):
             return jsonify({"error": "Missing required fields"}), 400
+        for field in ('start_point', 'destination'):
+            if not isinstance(data[field], str):
+                return jsonify({"error": f"{field} must be a string"}), 400
             
-        # Get prediction
-        prediction = predict_travel_time(
-            start_point=start_point,
-            destination=destination,
-            day_of_week=day_of_week,
-            departure_time=departure_time
-        )
-        
-        # Store prediction in database using service role
+        # Jitter is off by default so the best slot isn't picked by noise
         try:
-            # Create a new Supabase client with service role key
-            service_supabase = create_client(
-                os.environ.get("SUPABASE_URL"),
-                os.environ.get("SUPABASE_SERVICE_KEY")
+            step_minutes = int(data.get('step_minutes', 15))
+            slots = departure_slots(
+                data['day_of_week'],
+                data.get('window_start', '00:00'),
+                data.get('window_end', '23:45'),
+                step_minutes,
+                SWEEP_MAX_SLOTS
             )
+            top = max(int(data.get('top', 3)), 1)
+            jitter = parse_jitter_mode(data.get('jitter')) or 'off'
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
             
-            service_supabase.table('predictions').insert({
-                'user_id': user.user.id,
-                'start_point': start_point,
-                'destination': destination,
-                'day_of_week': day_of_week,
-                'departure_time': departure_time,
-                'predicted_time': prediction,
-                'created_at': datetime.now().isoformat()
-            }).execute()
-        except Exception as db_error:
-            print(f"Database error: {str(db_error)}")
-            # Continue even if database insert fails
-            
+        # Geocode the route once for every slot
+        with timed('geocode'):
+            start_coords, dest_coords = [to_lat_lng(c) for c in geocoder.geocode_many([data['start_point'], data['destination']])]
+        trips = [{
+            'start_point': data['start_point'],
+            'destination': data['destination'],
+            'day_of_week': day,
+            'departure_time': departure,
+            'route_type': data.get('route_type'),
+            'start_coords': start_coords,
+            'dest_coords': dest_coords,
+            'jitter': jitter,
+            # Each slot is scored at its own hour's speeds and detours, not the current hour's
+            'speed_at_departure': True
+        } for day, departure in slots]
+        
+        # Score every slot in one model call
+        with timed('inference'):
+            predictions = score_trips(trips)
+        curve, best = summarize_sweep(slots, predictions, top)
+        
         return jsonify({
-            'predicted_time': prediction,
-            'start_point': start_point,
-            'destination': destination,
-            'day_of_week': day_of_week,
-            'departure_time': departure_time
+            'start_point': data['start_point'],
+            'destination': data['destination'],
+            'step_minutes': step_minutes,
+            'slots': curve,
+            'best': best,
+            'count': len(curve)
         })
         
     except Exception as e:
-        print(f"Prediction error: {str(e)}")
-        return jsonify({"error": "Failed to process prediction"}), 500
+        logger.error("Sweep prediction error: %s", e)
+        return jsonify({"error": "Failed to process departure sweep"}), 500
 
 @app.route('/predictions/history', methods=['GET'])
 def get_prediction_history():
 
     try:
-        # Get auth token from header
-        auth_header = request.headers.get('Authorization')
-        if not auth_header:
-            return jsonify({"error": "No authorization token"}), 401
+        user, auth_error = authenticate_request()
+        if auth_error:
+            return auth_error
             
-        token = auth_header.split(' ')[1]
-        
         try:
-            # Verify token and get user
-            user = supabase.auth.get_user(token)
-            if not user:
-                return jsonify({"error": "Invalid token"}), 401
-                
-            # Get prediction history using service role client
-            service_supabase = create_client(
-                os.environ.get("SUPABASE_URL"),
-                os.environ.get("SUPABASE_SERVICE_KEY")
-            )
+            limit = min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+            fields = parse_fields(request.args.get('fields'))
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
             
-            response = service_supabase.table('predictions')\
-                .select('*')\
-                .eq('user_id', user.user.id)\
-                .order('created_at', desc=True)\
-                .execute()
-                
-            print("\nFetched predictions array:")
-            for prediction in response.data:
-                print(f"- ID: {prediction.get('id')}, Start: {prediction.get('start_point')}, Destination: {prediction.get('destination')}, Time: {prediction.get('predicted_time')}")
-            print(f"Total predictions found: {len(response.data)}\n")
+        user_id = user.user.id
+        page_key = (cursor, limit, tuple(fields))
+        page = history_cache.get(user_id, page_key)
+        
+        if page is None:
+            # Get one page of prediction history using a pooled service role client
+            with service_pool.client() as service_supabase, timed('db_query'):
+                query = service_supabase.table('predictions')\
+                    .select(','.join(fields))\
+                    .eq('user_id', user_id)
+                if after:
+                    created_at, row_id = after
+                    query = query.or_(
+                        f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}")'
+                    )
+                response = query\
+                    .order('created_at', desc=True)\
+                    .order('id', desc=True)\
+                    .limit(limit + 1)\
+                    .execute()
                 
-            return jsonify(response.data), 200
+            rows = response.data[:limit]
+            next_cursor = encode_cursor(rows[-1]) if len(response.data) > limit else None
+            page = (rows, next_cursor, compute_etag(rows, next_cursor))
+            history_cache.set(user_id, page_key, page)
             
-        except Exception as auth_error:
-            print(f"Authentication error: {str(auth_error)}")
-            return jsonify({"error": "Authentication failed"}), 401
+        rows, next_cursor, etag = page
+        
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+        else:
+            response = jsonify(rows)
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
             
     except Exception as e:
-        print(f"History error: {str(e)}")
+        logger.error("History error: %s", e)
         return jsonify({"error": "Failed to fetch prediction history"}), 500
 
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    return jsonify({
+        'geocode_cache': geocode_cache.stats(),
+        'gazetteer': gazetteer.stats(),
+        'prediction_writer': prediction_writer.stats(),
+        'token_verifier': token_verifier.stats(),
+        'history_cache': history_cache.stats(),
+        'traffic_cache': traffic_cache.stats(),
+        'traffic_stream': traffic_broadcaster.stats(),
+        'inference': inference_scheduler.stats(),
+        'inference_pool': inference_pool.stats() if inference_pool is not None else None,
+        'logging': logging_config.stats(),
+        'supabase_pool': service_pool.stats(),
+        'eta_grid': eta_grid_job.stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    return jsonify(startup_state), 200 if startup_state['ready'] else 503
+
+@app.route('/model/version', methods=['GET'])
+def model_version():
+    return jsonify(get_model_version())
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
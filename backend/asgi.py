@@ -0,0 +1,459 @@
+# ASGI entry point: uvicorn asgi:application --workers N
+#
+# POST /predict, GET /api/traffic and the /api/traffic/stream SSE feed are
+# served natively with async HTTP clients so slow Mapbox and Supabase calls
+# and long-lived streams do not hold a thread each, and model inference runs
+# on a bounded thread pool. Every other route is passed through to the Flask
+# app unchanged, on its own thread pool.
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+import httpx
+
+from app import (
+    app as flask_app, geocode_cache, gazetteer, token_verifier, traffic_cache, traffic_cache_key,
+    traffic_payload, parse_traffic_options, parse_prediction_input, record_prediction, to_lat_lng, prediction_writer,
+    inference_scheduler, traffic_broadcaster, MAPBOX_ACCESS_TOKEN, SERVER_TIMING, TRAFFIC_STREAM_HEARTBEAT
+)
+from traffic_stream import format_event
+from geocoding import AsyncGeocodingClient, MAPBOX_GEOCODING_URL
+from model import load_model
+from metrics import timed, begin_request, end_request, request_timings, server_timing
+
+logger = logging.getLogger(__name__)
+
+# Model inference is CPU-bound: a few threads, with at most INFERENCE_MAX_PENDING calls queued
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', os.cpu_count() or 4))
+INFERENCE_MAX_PENDING = int(os.environ.get('INFERENCE_MAX_PENDING', 256))
+HTTP_MAX_CONNECTIONS = int(os.environ.get('ASYNC_HTTP_MAX_CONNECTIONS', 64))
+# Threads for routes passed through to Flask; each request holds one while it runs
+WSGI_WORKERS = int(os.environ.get('WSGI_WORKERS', 32))
+
+class AsyncServices:
+    """Async HTTP clients and the inference pool, created inside the event loop"""
+
+    def __init__(self):
+        self.geocoder = None
+        self.auth_client = None
+        self.executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix='inference')
+        self.inference_slots = None
+        self.auth_slots = None
+        self.traffic_in_flight = {}
+
+    async def start(self):
+        self.geocoder = AsyncGeocodingClient(
+            MAPBOX_ACCESS_TOKEN,
+            base_url=os.environ.get('MAPBOX_GEOCODING_URL', MAPBOX_GEOCODING_URL),
+            cache=geocode_cache,
+            timeout=float(os.environ.get('GEOCODE_TIMEOUT', 5)),
+            max_retries=int(os.environ.get('GEOCODE_MAX_RETRIES', 2)),
+            max_connections=HTTP_MAX_CONNECTIONS,
+            gazetteer=gazetteer
+        )
+        self.auth_client = httpx.AsyncClient(
+            base_url=os.environ.get('SUPABASE_URL', ''),
+            timeout=httpx.Timeout(5.0, connect=3.05),
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS)
+        )
+        self.inference_slots = asyncio.Semaphore(INFERENCE_MAX_PENDING)
+        self.auth_slots = asyncio.Semaphore(HTTP_MAX_CONNECTIONS)
+        # Load the model before the first request instead of during it
+        await self.run_cpu(load_model)
+
+    async def stop(self):
+        if self.geocoder is not None:
+            await self.geocoder.aclose()
+        if self.auth_client is not None:
+            await self.auth_client.aclose()
+        self.executor.shutdown(wait=False)
+        prediction_writer.close()
+
+    async def run_cpu(self, func, *args, **kwargs):
+        """Run CPU-bound work on the inference pool, waiting if too much is queued"""
+        async with self.inference_slots:
+            loop = asyncio.get_running_loop()
+            # Carry the request's context so stage timings recorded in the pool are attributed to it
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self.executor, lambda: context.run(func, *args, **kwargs))
+
+    async def predict(self, trip):
+        """Score a trip through the shared micro-batching scheduler"""
+        if not inference_scheduler.enabled:
+            return await self.run_cpu(inference_scheduler.predict, trip)
+        async with self.inference_slots:
+            return await asyncio.wrap_future(inference_scheduler.submit(trip))
+
+    async def verify_token(self, token):
+        """Async counterpart of token_verifier.verify using the Supabase auth REST API"""
+        if token_verifier.local:
+            # A JWKS key lookup can block on the network, so keep it off the event loop
+            async with self.auth_slots:
+                return await asyncio.to_thread(token_verifier.verify, token)
+
+        user = token_verifier.cached(token)
+        if user is not None:
+            return user
+
+        async with self.auth_slots:
+            response = await self.auth_client.get('/auth/v1/user', headers={
+                'apikey': os.environ.get('SUPABASE_KEY', ''),
+                'Authorization': f'Bearer {token}'
+            })
+        if response.status_code != 200:
+            return None
+
+        data = response.json()
+        user = SimpleNamespace(user=SimpleNamespace(
+            id=data.get('id'),
+            email=data.get('email'),
+            role=data.get('role'),
+            app_metadata=data.get('app_metadata', {}),
+            user_metadata=data.get('user_metadata', {})
+        ))
+        token_verifier.store(token, user)
+        return user
+
+services = AsyncServices()
+
+def cors_headers(scope):
+    origin = dict(scope['headers']).get(b'origin', b'*').decode('latin-1')
+    return [
+        (b'access-control-allow-origin', origin.encode('latin-1')),
+        (b'access-control-allow-headers', b'Content-Type,Authorization,X-Requested-With'),
+        (b'access-control-allow-methods', b'GET,POST,PUT,DELETE,OPTIONS'),
+        (b'access-control-allow-credentials', b'true'),
+        (b'access-control-expose-headers', b'Content-Type, Authorization, ETag, X-Next-Cursor'),
+        (b'vary', b'Origin')
+    ]
+
+async def send_json(scope, send, payload, status=200):
+    body = json.dumps(payload).encode()
+    headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode())
+    ] + cors_headers(scope)
+    if SERVER_TIMING:
+        headers.append((b'server-timing', server_timing(request_timings()).encode()))
+    scope['metrics.status'] = status
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def read_json(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    try:
+        return json.loads(b''.join(chunks) or b'null')
+    except ValueError:
+        return None
+
+async def authenticate(scope):
+    """Verify the request's bearer token and return (user, (error_payload, status))"""
+    auth_header = dict(scope['headers']).get(b'authorization', b'').decode('latin-1')
+    if not auth_header:
+        return None, ({"error": "No authorization token"}, 401)
+
+    parts = auth_header.split(' ')
+    if len(parts) < 2 or not parts[1]:
+        return None, ({"error": "Invalid token"}, 401)
+
+    try:
+        with timed('auth'):
+            user = await services.verify_token(parts[1])
+        if not user:
+            return None, ({"error": "Invalid token"}, 401)
+    except Exception as auth_error:
+        logger.error("Authentication error: %s", auth_error)
+        return None, ({"error": "Authentication failed"}, 401)
+
+    return user, None
+
+async def predict(scope, receive, send):
+    try:
+        user, auth_error = await authenticate(scope)
+        if auth_error:
+            return await send_json(scope, send, *auth_error)
+
+        trip, jitter, input_error = parse_prediction_input(await read_json(receive))
+        if input_error:
+            return await send_json(scope, send, {"error": input_error}, 400)
+
+        with timed('geocode'):
+            locations = await services.geocoder.geocode_many([trip['start_point'], trip['destination']])
+        start_coords, dest_coords = [to_lat_lng(c) for c in locations]
+
+        with timed('inference'):
+            prediction = await services.predict({
+                **trip, 'start_coords': start_coords, 'dest_coords': dest_coords, 'jitter': jitter
+            })
+
+        record_prediction(user.user.id, trip, prediction)
+
+        await send_json(scope, send, {'predicted_time': prediction, **trip})
+
+    except Exception as e:
+        logger.error("Prediction error: %s", e)
+        await send_json(scope, send, {"error": "Failed to process prediction"}, 500)
+
+async def compute_traffic(key, start, destination, path=None, segments=None):
+    if path is not None:
+        result = await services.run_cpu(traffic_payload, start, destination, None, None, path, segments)
+    else:
+        with timed('geocode'):
+            start_location, dest_location = await services.geocoder.geocode_many([start, destination])
+        result = await services.run_cpu(
+            traffic_payload, start, destination, start_location, dest_location, segments=segments
+        )
+    if result[1] == 200:
+        traffic_cache.set(key, result)
+    return result
+
+async def get_traffic(start, destination, path=None, segments=None):
+    """Async single-flight lookup sharing traffic_cache with the Flask routes"""
+    key = traffic_cache_key(start, destination, path, segments)
+    cached = traffic_cache.peek(key)
+    if cached is not None:
+        return cached
+
+    task = services.traffic_in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(compute_traffic(key, start, destination, path, segments))
+        services.traffic_in_flight[key] = task
+        task.add_done_callback(lambda _: services.traffic_in_flight.pop(key, None))
+    return await asyncio.shield(task)
+
+async def traffic(scope, receive, send):
+    try:
+        args = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        start = args.get('start', [None])[0]
+        destination = args.get('destination', [None])[0]
+
+        if not start or not destination:
+            return await send_json(scope, send, {'error': 'Missing start or destination'}, 400)
+
+        path, segments, error = parse_traffic_options(args.get('polyline', [None])[0], args.get('segments', [None])[0])
+        if error:
+            return await send_json(scope, send, {'error': error}, 400)
+
+        payload, status = await get_traffic(start, destination, path, segments)
+        await send_json(scope, send, payload, status)
+
+    except Exception as e:
+        logger.error("Error in get_traffic_data: %s", e)
+        await send_json(scope, send, {'error': str(e)}, 500)
+
+class AsyncTrafficUpdates:
+    """Broadcaster subscriber queue that hands updates to the event loop
+
+    The broadcaster pushes from its own thread; updates are moved onto an
+    asyncio.Queue on the loop, dropping the oldest when it is full.
+    """
+
+    def __init__(self, loop, max_pending=2):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    def put_nowait(self, result):
+        try:
+            self.loop.call_soon_threadsafe(self._put, result)
+        except RuntimeError:
+            # The loop has shut down; nobody is listening any more
+            pass
+
+    def get_nowait(self):
+        return self.queue.get_nowait()
+
+    def _put(self, result):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(result)
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+async def traffic_stream(scope, receive, send):
+    args = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    start = args.get('start', [None])[0]
+    destination = args.get('destination', [None])[0]
+
+    if not start or not destination:
+        return await send_json(scope, send, {'error': 'Missing start or destination'}, 400)
+
+    updates = AsyncTrafficUpdates(asyncio.get_running_loop(), traffic_broadcaster.max_pending)
+    key, _ = traffic_broadcaster.subscribe(start, destination, updates)
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        scope['metrics.status'] = 200
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ] + cors_headers(scope)})
+
+        # Send the current state right away, then whatever the broadcaster pushes
+        try:
+            event = format_event(*await get_traffic(start, destination))
+        except Exception as e:
+            logger.error("Error in stream_traffic_data: %s", e)
+            event = format_event({'error': str(e)}, 500)
+
+        while not disconnected.done():
+            await send({'type': 'http.response.body', 'body': event.encode(), 'more_body': True})
+            update = asyncio.ensure_future(updates.queue.get())
+            await asyncio.wait({update, disconnected}, timeout=TRAFFIC_STREAM_HEARTBEAT,
+                               return_when=asyncio.FIRST_COMPLETED)
+            if update.done():
+                event = format_event(*update.result())
+            else:
+                update.cancel()
+                event = ': keep-alive\n\n'
+    finally:
+        disconnected.cancel()
+        traffic_broadcaster.unsubscribe(key, updates)
+
+ROUTES = {
+    ('POST', '/predict'): predict,
+    ('GET', '/api/traffic'): traffic,
+    ('GET', '/api/traffic/stream'): traffic_stream
+}
+
+wsgi_executor = ThreadPoolExecutor(max_workers=WSGI_WORKERS, thread_name_prefix='wsgi')
+
+def wsgi_environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope and a file holding the request body"""
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'SERVER_NAME': scope['server'][0] if scope.get('server') else 'localhost',
+        'SERVER_PORT': str(scope['server'][1]) if scope.get('server') else '80',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    if environ['PATH_INFO'].startswith(environ['SCRIPT_NAME']):
+        environ['PATH_INFO'] = environ['PATH_INFO'][len(environ['SCRIPT_NAME']):]
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1')
+        if name in ('content-length', 'content-type'):
+            key = name.upper().replace('-', '_')
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+class ThreadedWsgiToAsgi:
+    """Runs a WSGI app for ASGI servers, each request on its own thread from executor
+
+    asgiref's WsgiToAsgi runs every WSGI request on one shared thread, so a
+    single slow request would hold up all the others.
+    """
+
+    def __init__(self, wsgi_application, executor):
+        self.wsgi_application = wsgi_application
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            raise ValueError("WSGI bridge received a non-HTTP scope")
+
+        with SpooledTemporaryFile(max_size=65536) as body:
+            while True:
+                message = await receive()
+                if message['type'] != 'http.request':
+                    return  # Client went away before sending the whole body
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+
+            loop = asyncio.get_running_loop()
+            def send_sync(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+            await loop.run_in_executor(self.executor, self.run_wsgi_app, wsgi_environ(scope, body), send_sync)
+
+    def run_wsgi_app(self, environ, send_sync):
+        """Call the WSGI app and stream its response; runs on an executor thread"""
+        response = {'start': None, 'started': False}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response['started']:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]
+            }
+            return write
+
+        def write(data):
+            if not response['started']:
+                response['started'] = True
+                send_sync(response['start'])
+            if data:
+                send_sync({'type': 'http.response.body', 'body': data, 'more_body': True})
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            for chunk in result:
+                write(chunk)
+            write(b'')
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        send_sync({'type': 'http.response.body'})
+
+wsgi_app = ThreadedWsgiToAsgi(flask_app, wsgi_executor)
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                await services.start()
+            except Exception as e:
+                logger.error(f"ASGI startup failed: {str(e)}")
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await services.stop()
+            wsgi_executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    handler = ROUTES.get((scope.get('method'), scope.get('path'))) if scope['type'] == 'http' else None
+    if handler is None:
+        return await wsgi_app(scope, receive, send)
+
+    started = begin_request()
+    try:
+        await handler(scope, receive, send)
+    finally:
+        end_request(started, scope['method'], scope['path'], scope.get('metrics.status', 500))
@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.stubs import StubServer
+
+TRIP = {
+    'start_point': 'Koramangala, Bengaluru',
+    'destination': 'Whitefield, Bengaluru',
+    'day_of_week': 'Monday',
+    'departure_time': '08:30',
+    'start_coords': (12.9352, 77.6245),
+    'dest_coords': (12.9698, 77.7500)
+}
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    samples = sorted(samples)
+    def percentile(p):
+        return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 3)
+    return {
+        'runs': len(samples),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 3),
+        'min_ms': round(samples[0] * 1000, 3),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99)
+    }
+
+def measure(func, repeat, warmup=3):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+def make_trips(n):
+    trips = []
+    for i in range(n):
+        trips.append({
+            **TRIP,
+            'day_of_week': DAYS[i % 7],
+            'departure_time': f'{i % 24:02d}:{(i * 13) % 60:02d}',
+            'dest_coords': (12.85 + (i % 97) * 0.0025, 77.45 + (i % 89) * 0.0035)
+        })
+    return trips
+
+def bench_model_load(model):
+    """Cold load of a fresh reloader and a forced reload of the shared one"""
+    cold = []
+    for _ in range(3):
+        reloader = model.ModelReloader(check_interval=0)
+        started = time.perf_counter()
+        reloader.get()
+        cold.append(time.perf_counter() - started)
+    return {
+        'cold_load': summarize(cold),
+        'reload': measure(lambda: model.load_model(force_refresh=True), repeat=3, warmup=0)
+    }
+
+def bench_single_row(model, repeat):
+    return measure(lambda: model.predict_travel_time(**TRIP), repeat)
+
+def bench_batch(model, sizes, repeat):
+    results = {}
+    for size in sizes:
+        trips = make_trips(size)
+        summary = measure(lambda: model.predict_travel_times(trips), repeat, warmup=1)
+        summary['rows_per_s'] = round(size / (summary['p50_ms'] / 1000), 1)
+
+        # Python-level allocation peak of one call, traced separately so it doesn't skew the timings
+        tracemalloc.start()
+        model.predict_travel_times(trips)
+        summary['peak_alloc_mb'] = round(tracemalloc.get_traced_memory()[1] / (1 << 20), 2)
+        tracemalloc.stop()
+        results[str(size)] = summary
+    return results
+
+def bench_endpoints(app_module, repeat):
+    client = app_module.app.test_client()
+    headers = {'Authorization': f'Bearer bench-{uuid.uuid4().hex}'}
+    body = {key: TRIP[key] for key in ('start_point', 'destination', 'day_of_week', 'departure_time')}
+
+    def predict():
+        response = client.post('/predict', json=body, headers=headers)
+        assert response.status_code == 200, response.get_json()
+
+    def traffic_uncached():
+        # A new route every call so the response cache and geocode cache both miss
+        route = uuid.uuid4().hex[:12]
+        response = client.get('/api/traffic', query_string={'start': f'Start {route}', 'destination': f'End {route}'})
+        assert response.status_code == 200, response.get_json()
+
+    def traffic_cached():
+        response = client.get('/api/traffic', query_string={'start': TRIP['start_point'], 'destination': TRIP['destination']})
+        assert response.status_code == 200, response.get_json()
+
+    return {
+        'predict': measure(predict, repeat),
+        'traffic_uncached': measure(traffic_uncached, repeat),
+        'traffic_cached': measure(traffic_cached, repeat)
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args):
+    with StubServer(args.upstream_delay) as stub:
+        os.environ.update(stub.env())
+        os.environ.setdefault('MODEL_CHECK_INTERVAL', '0')
+        os.environ.setdefault('ETA_GRID_REFRESH_SECONDS', '0')
+        # Load the model when the benchmarks ask for it rather than on a warm-up thread
+        os.environ.setdefault('MODEL_PRELOAD', 'lazy')
+        os.chdir(BACKEND_DIR)
+
+        started = time.perf_counter()
+        import model
+        import app as app_module
+        import_seconds = time.perf_counter() - started
+
+        results = {
+            'import_s': round(import_seconds, 3),
+            'model_load': bench_model_load(model),
+            'single_row': bench_single_row(model, args.repeat),
+            'batch': bench_batch(model, args.batch_sizes, max(3, args.repeat // 20)),
+            'endpoints': bench_endpoints(app_module, max(10, args.repeat // 4))
+        }
+
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        max_rss_mb = max_rss / (1 << 20) if sys.platform == 'darwin' else max_rss / 1024
+        results['memory'] = {
+            'max_rss_mb': round(max_rss_mb, 1)
+        }
+
+        app_module.prediction_writer.close()
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'compiled_model': os.environ.get('USE_COMPILED_MODEL', 'false'),
+        'results': results
+    }
+
+def flatten(results, prefix=''):
+    """Flatten nested results into {'a.b.p50_ms': value} for comparison"""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{name}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(baseline_path, candidate_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+
+    print(f"{'metric':<45} {baseline.get('commit') or 'baseline':>12} {candidate.get('commit') or 'candidate':>12} {'change':>9}")
+    old, new = flatten(baseline['results']), flatten(candidate['results'])
+    for name in sorted(set(old) & set(new)):
+        if name.endswith('.runs'):
+            continue
+        change = f"{(new[name] - old[name]) / old[name] * 100:+.1f}%" if old[name] else 'n/a'
+        print(f"{name:<45} {old[name]:>12} {new[name]:>12} {change:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the prediction and traffic paths')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--repeat', type=int, default=200, help='Iterations for latency benchmarks')
+    parser.add_argument('--batch-sizes', type=lambda value: [int(size) for size in value.split(',')],
+                        default=[100, 1000, 10000])
+    parser.add_argument('--upstream-delay', type=float, default=0.0,
+                        help='Seconds the Mapbox/Supabase stubs wait before replying')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help='Compare two result files instead of running')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    output_path = os.path.abspath(args.output) if args.output else None
+    report = run(args)
+    output = json.dumps(report, indent=2)
+    if output_path:
+        with open(output_path, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+if __name__ == '__main__':
+    main()
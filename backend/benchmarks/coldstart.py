@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.bench import git_commit
+from benchmarks.stubs import StubServer
+
+MODES = ('lazy', 'background', 'eager')
+BODY = {
+    'start_point': 'Koramangala, Bengaluru',
+    'destination': 'Whitefield, Bengaluru',
+    'day_of_week': 'Monday',
+    'departure_time': '08:30'
+}
+
+def child(args):
+    """Runs in a fresh interpreter: import the app, then time the first /predict"""
+    timings = {'main': time.time()}
+    started = time.perf_counter()
+    import app as app_module
+    timings['import_s'] = time.perf_counter() - started
+    timings['imported'] = time.time()
+
+    client = app_module.app.test_client()
+    if args.wait_ready:
+        while client.get('/ready').status_code != 200:
+            time.sleep(0.01)
+        timings['ready'] = time.time()
+
+    headers = {'Authorization': f'Bearer bench-{uuid.uuid4().hex}'}
+    started = time.perf_counter()
+    response = client.post('/predict', json=BODY, headers=headers)
+    timings['first_request_ms'] = (time.perf_counter() - started) * 1000
+    timings['responded'] = time.time()
+    timings['status'] = response.status_code
+
+    app_module.prediction_writer.close()
+    print(json.dumps(timings))
+
+def run_child(mode, wait_ready, env):
+    command = [sys.executable, os.path.abspath(__file__), 'child']
+    if wait_ready:
+        command.append('--wait-ready')
+    spawned = time.time()
+    result = subprocess.run(command, cwd=BACKEND_DIR, env={**os.environ, **env, 'MODEL_PRELOAD': mode},
+                            capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    if timings['status'] != 200:
+        raise RuntimeError(f"First /predict in {mode} mode returned {timings['status']}")
+
+    # Wall-clock offsets from process spawn, so interpreter startup is included
+    sample = {
+        'interpreter_s': timings['main'] - spawned,
+        'import_s': timings['import_s'],
+        'first_request_ms': timings['first_request_ms'],
+        'first_response_s': timings['responded'] - spawned
+    }
+    if wait_ready:
+        sample['ready_s'] = timings['ready'] - spawned
+    return sample
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+def run(args):
+    results = {}
+    with StubServer(args.upstream_delay) as stub:
+        env = {**stub.env(), 'MODEL_CHECK_INTERVAL': '0', 'ETA_GRID_REFRESH_SECONDS': '0', 'LOG_FILE': ''}
+        for mode in args.modes.split(','):
+            # "immediate" sends the first request as soon as the import returns;
+            # "after_ready" waits for /ready first, as a load balancer would
+            for scenario, wait_ready in (('immediate', False), ('after_ready', True)):
+                samples = [run_child(mode, wait_ready, env) for _ in range(args.runs)]
+                results[f'{mode}.{scenario}'] = {
+                    name: round(median([sample[name] for sample in samples]), 3) for name in samples[0]
+                }
+                print(f"{mode:<10} {scenario:<12} {results[f'{mode}.{scenario}']}", file=sys.stderr)
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'runs': args.runs,
+        'results': results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold start: import time and first-request latency per MODEL_PRELOAD mode')
+    parser.add_argument('role', nargs='?', default='run', choices=['run', 'child'])
+    parser.add_argument('--wait-ready', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--modes', default=','.join(MODES), help='Comma-separated MODEL_PRELOAD modes to compare')
+    parser.add_argument('--runs', type=int, default=3, help='Fresh processes per mode and scenario (median is reported)')
+    parser.add_argument('--upstream-delay', type=float, default=0.0,
+                        help='Seconds the Mapbox/Supabase stubs wait before replying')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    if args.role == 'child':
+        child(args)
+        return
+
+    output_path = os.path.abspath(args.output) if args.output else None
+    output = json.dumps(run(args), indent=2)
+    if output_path:
+        with open(output_path, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.stubs import StubServer
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def serve_wsgi(port, threads):
+    """Serve the Flask app from a fixed pool of threads, like a gthread worker"""
+    from werkzeug.serving import BaseWSGIServer
+    from app import app
+
+    class PooledWSGIServer(BaseWSGIServer):
+        request_queue_size = 4096
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.pool = ThreadPoolExecutor(max_workers=threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    PooledWSGIServer('127.0.0.1', port, app).serve_forever()
+
+def serve_asgi(port):
+    import uvicorn
+
+    uvicorn.run('asgi:application', host='127.0.0.1', port=port, log_level='warning',
+                backlog=4096, timeout_keep_alive=30)
+
+def start_server(mode, port, threads, env):
+    command = [sys.executable, os.path.abspath(__file__), 'serve', '--mode', mode,
+               '--port', str(port), '--threads', str(threads)]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env={**os.environ, **env},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def wait_ready(url, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f'{url}/ready', timeout=5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Server at {url} did not become ready")
+
+def make_request(endpoint, index):
+    """Request with unique addresses and token so no cache can answer it"""
+    start = f'Bench Start {uuid.uuid4().hex[:12]}'
+    destination = f'Bench Destination {uuid.uuid4().hex[:12]}'
+    if endpoint == 'traffic':
+        return 'GET', '/api/traffic', {'params': {'start': start, 'destination': destination}}
+    return 'POST', '/predict', {
+        'json': {
+            'start_point': start,
+            'destination': destination,
+            'day_of_week': DAYS[index % 7],
+            'departure_time': f'{index % 24:02d}:{(index * 7) % 60:02d}'
+        },
+        'headers': {'Authorization': f'Bearer bench-{uuid.uuid4().hex}'}
+    }
+
+async def run_load(url, endpoint, requests, concurrency, timeout):
+    latencies = []
+    statuses = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        counter = iter(range(requests))
+
+        async def worker():
+            for index in counter:
+                method, path, kwargs = make_request(endpoint, index)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **kwargs)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 2),
+        'throughput_rps': round(requests / elapsed, 1),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'statuses': {str(status): count for status, count in statuses.items()}
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare WSGI and ASGI serving against slow local upstream stubs')
+    sub = parser.add_subparsers(dest='command')
+
+    serve = sub.add_parser('serve')
+    serve.add_argument('--mode', choices=['wsgi', 'asgi'], required=True)
+    serve.add_argument('--port', type=int, required=True)
+    serve.add_argument('--threads', type=int, default=16)
+
+    parser.add_argument('--modes', default='wsgi,asgi')
+    parser.add_argument('--endpoint', choices=['predict', 'traffic'], default='predict')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--upstream-delay', type=float, default=0.2)
+    parser.add_argument('--threads', type=int, default=16, help='WSGI worker threads')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        os.chdir(BACKEND_DIR)
+        if args.mode == 'wsgi':
+            serve_wsgi(args.port, args.threads)
+        else:
+            serve_asgi(args.port)
+        return
+
+    results = {'endpoint': args.endpoint, 'upstream_delay_s': args.upstream_delay, 'modes': {}}
+    with StubServer(args.upstream_delay) as stub:
+        # Upstream errors should show up in the results rather than be retried
+        env = {**stub.env(), 'GEOCODE_MAX_RETRIES': '0', 'GEOCODE_WORKERS': str(args.threads),
+               'ETA_GRID_REFRESH_SECONDS': '0'}
+        for mode in args.modes.split(','):
+            port = free_port()
+            server = start_server(mode, port, args.threads, env)
+            url = f'http://127.0.0.1:{port}'
+            try:
+                wait_ready(url)
+                asyncio.run(run_load(url, args.endpoint, min(50, args.requests), 10, args.timeout))
+                results['modes'][mode] = asyncio.run(
+                    run_load(url, args.endpoint, args.requests, args.concurrency, args.timeout)
+                )
+            finally:
+                server.terminate()
+                server.wait(10)
+            print(f"{mode}: {json.dumps(results['modes'][mode])}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
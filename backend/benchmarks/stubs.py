@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from urllib.parse import unquote
+
+import uvicorn
+
+# Addresses are placed deterministically inside this Bengaluru bounding box
+MIN_LNG, MAX_LNG = 77.45, 77.75
+MIN_LAT, MAX_LAT = 12.85, 13.10
+
+def stub_coordinates(address):
+    """Deterministic (lng, lat) for an address"""
+    digest = hashlib.sha256(address.lower().encode()).digest()
+    x = int.from_bytes(digest[:4], 'big') / 2 ** 32
+    y = int.from_bytes(digest[4:8], 'big') / 2 ** 32
+    return MIN_LNG + x * (MAX_LNG - MIN_LNG), MIN_LAT + y * (MAX_LAT - MIN_LAT)
+
+class UpstreamStub:
+    """ASGI app imitating the Mapbox geocoding and Supabase auth/REST endpoints
+
+    Every response is delayed by `delay` seconds to model a slow upstream.
+    """
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.counts = {'geocode': 0, 'auth': 0, 'insert': 0, 'other': 0}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                await send({'type': message['type'] + '.complete'})
+                if message['type'] == 'lifespan.shutdown':
+                    return
+
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+        path = scope['path']
+        headers = dict(scope['headers'])
+        if path.startswith('/geocoding/') and path.endswith('.json'):
+            self.counts['geocode'] += 1
+            address = unquote(path[len('/geocoding/'):-len('.json')])
+            status, payload = 200, {'features': [{'center': list(stub_coordinates(address))}]}
+        elif path == '/auth/v1/user':
+            self.counts['auth'] += 1
+            token = headers.get(b'authorization', b'').decode().split(' ')[-1]
+            user_id = hashlib.sha256(token.encode()).hexdigest()[:32]
+            status, payload = 200, {
+                'id': user_id,
+                'aud': 'authenticated',
+                'role': 'authenticated',
+                'email': f'{user_id[:8]}@example.com',
+                'app_metadata': {},
+                'user_metadata': {},
+                'created_at': '2024-01-01T00:00:00Z'
+            }
+        elif path.startswith('/rest/v1/'):
+            self.counts['insert' if scope['method'] == 'POST' else 'other'] += 1
+            status, payload = (201 if scope['method'] == 'POST' else 200), []
+        else:
+            self.counts['other'] += 1
+            status, payload = 404, {'error': 'not found'}
+
+        data = json.dumps(payload).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(data)).encode())]
+        })
+        await send({'type': 'http.response.body', 'body': data})
+
+class StubServer:
+    """Runs an UpstreamStub on a background thread; use as a context manager"""
+
+    def __init__(self, delay=0.1, host='127.0.0.1', port=0):
+        self.stub = UpstreamStub(delay)
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    def env(self):
+        """Environment variables pointing the backend at this stub"""
+        return {
+            'MAPBOX_ACCESS_TOKEN': 'stub-token',
+            'MAPBOX_GEOCODING_URL': f'{self.url}/geocoding',
+            'SUPABASE_URL': self.url,
+            'SUPABASE_KEY': 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.stub',
+            'SUPABASE_SERVICE_KEY': 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.stub'
+        }
+
+    def start(self):
+        config = uvicorn.Config(self.stub, host=self.host, port=self.port, log_level='warning',
+                                backlog=4096, limit_concurrency=None)
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, name='upstream-stub', daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        if not self.port:
+            self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve local Mapbox/Supabase stubs')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--delay', type=float, default=0.1)
+    args = parser.parse_args()
+
+    with StubServer(args.delay, port=args.port) as server:
+        for name, value in server.env().items():
+            print(f'{name}={value}')
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,566 @@
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# How a node routes missing values
+MISSING_COMPARE = 0       # NaN is compared as-is and goes right
+MISSING_DEFAULT = 1       # NaN follows the node's default direction
+MISSING_ZERO_DEFAULT = 2  # NaN and zero follow the default direction
+MISSING_AS_ZERO = 3       # NaN is treated as zero
+
+# Objectives whose raw margin is the prediction (identity link)
+XGBOOST_IDENTITY_OBJECTIVES = {
+    'reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror',
+    'reg:quantileerror', 'reg:squaredlogerror', 'reg:linear'
+}
+LIGHTGBM_IDENTITY_OBJECTIVES = {
+    'regression', 'regression_l1', 'huber', 'fair', 'quantile', 'mape'
+}
+
+ROW_CHUNK_SIZE = 4096
+
+class _TreeGroupBuilder:
+    """Accumulates trees of one library into flat node arrays"""
+
+    def __init__(self):
+        self.feature = []
+        self.threshold = []
+        self.left = []
+        self.right = []
+        self.value = []
+        self.default_left = []
+        self.missing_mode = []
+        self.roots = []
+        self.max_depth = 0
+
+    def add_node(self):
+        self.feature.append(0)
+        self.threshold.append(0.0)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.value.append(0.0)
+        self.default_left.append(False)
+        self.missing_mode.append(MISSING_COMPARE)
+        return len(self.feature) - 1
+
+    def set_leaf(self, index, value):
+        # Leaves point at themselves so extra traversal steps are no-ops
+        self.left[index] = index
+        self.right[index] = index
+        self.value[index] = value
+
+    def set_split(self, index, feature, threshold, left, right, default_left=False,
+                  missing_mode=MISSING_COMPARE):
+        self.feature[index] = feature
+        self.threshold[index] = threshold
+        self.left[index] = left
+        self.right[index] = right
+        self.default_left[index] = default_left
+        self.missing_mode[index] = missing_mode
+
+    def build(self, name, strict, dtype, bias=0.0, scale=1.0, zero_as_missing=False):
+        return TreeGroup(
+            name=name,
+            feature=np.asarray(self.feature, dtype=np.int32),
+            threshold=np.asarray(self.threshold, dtype=np.float64),
+            left=np.asarray(self.left, dtype=np.int32),
+            right=np.asarray(self.right, dtype=np.int32),
+            value=np.asarray(self.value, dtype=np.float64),
+            default_left=np.asarray(self.default_left, dtype=bool),
+            missing_mode=np.asarray(self.missing_mode, dtype=np.int8),
+            roots=np.asarray(self.roots, dtype=np.int32),
+            max_depth=self.max_depth,
+            strict=strict,
+            dtype=dtype,
+            bias=bias,
+            scale=scale,
+            zero_as_missing=zero_as_missing
+        )
+
+def _round_thresholds(threshold, dtype, strict):
+    """Cast thresholds to the comparison dtype without changing any x <= t outcome"""
+    rounded = threshold.astype(dtype)
+    if not strict and rounded.dtype != threshold.dtype:
+        # Round down so every value of dtype compares exactly as against the original
+        too_high = rounded.astype(threshold.dtype) > threshold
+        rounded[too_high] = np.nextafter(rounded[too_high], np.dtype(dtype).type(-np.inf))
+    return rounded
+
+class TreeGroup:
+    """Flat, array-backed evaluator for the trees of one boosted model
+
+    All trees are walked together: each step gathers the current node of
+    every (row, tree) pair and moves it left or right in one NumPy operation.
+    """
+
+    def __init__(self, name, feature, threshold, left, right, value, default_left,
+                 missing_mode, roots, max_depth, strict, dtype, bias=0.0, scale=1.0,
+                 zero_as_missing=False):
+        self.name = name
+        self.feature = feature
+        self.threshold = _round_thresholds(threshold, dtype, strict)
+        self.left = left
+        self.right = right
+        self.value = value
+        self.default_left = default_left
+        self.missing_mode = missing_mode
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.strict = bool(strict)
+        self.dtype = np.dtype(dtype)
+        self.bias = float(bias)
+        self.scale = float(scale)
+        self.zero_as_missing = bool(zero_as_missing)
+        self._has_missing_rules = bool(np.any(missing_mode != MISSING_COMPARE))
+        self._has_zero_rules = bool(np.any(missing_mode == MISSING_ZERO_DEFAULT))
+        self._children = np.stack([right, left], axis=1).ravel().astype(np.intp)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=self.dtype)
+        if self.zero_as_missing:
+            X = np.where(X == 0, np.nan, X)
+
+        outputs = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], ROW_CHUNK_SIZE):
+            chunk = X[start:start + ROW_CHUNK_SIZE]
+            outputs[start:start + len(chunk)] = self._predict_chunk(chunk)
+        return self.bias + self.scale * outputs
+
+    def _predict_chunk(self, X):
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, len(self.roots))).astype(np.intp)
+        # Missing-value routing only matters when the input has NaNs (or zeros for Zero rules)
+        check_missing = self._has_zero_rules or (self._has_missing_rules and np.isnan(flat).any())
+
+        for _ in range(self.max_depth):
+            x = flat[row_offsets + self.feature[nodes]]
+            threshold = self.threshold[nodes]
+            go_left = x < threshold if self.strict else x <= threshold
+
+            if check_missing:
+                mode = self.missing_mode[nodes]
+                is_nan = np.isnan(x)
+                as_zero = is_nan & (mode == MISSING_AS_ZERO)
+                if self.strict:
+                    go_left |= as_zero & (0.0 < threshold)
+                else:
+                    go_left |= as_zero & (0.0 <= threshold)
+                use_default = (is_nan & ((mode == MISSING_DEFAULT) | (mode == MISSING_ZERO_DEFAULT))) | \
+                              ((mode == MISSING_ZERO_DEFAULT) & (x == 0))
+                go_left = np.where(use_default, self.default_left[nodes], go_left)
+
+            # children holds (right, left) pairs so the branch is a single gather
+            nodes = self._children[2 * nodes + go_left]
+
+        return self.value[nodes].sum(axis=1)
+
+    def to_arrays(self, prefix):
+        arrays = {
+            f'{prefix}{name}': getattr(self, name)
+            for name in ('feature', 'threshold', 'left', 'right', 'value',
+                         'default_left', 'missing_mode', 'roots')
+        }
+        meta = {
+            'name': self.name,
+            'max_depth': self.max_depth,
+            'strict': self.strict,
+            'dtype': self.dtype.name,
+            'bias': self.bias,
+            'scale': self.scale,
+            'zero_as_missing': self.zero_as_missing
+        }
+        return arrays, meta
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix, meta):
+        return cls(
+            **{name: arrays[f'{prefix}{name}']
+               for name in ('feature', 'threshold', 'left', 'right', 'value',
+                            'default_left', 'missing_mode', 'roots')},
+            **meta
+        )
+
+class FeatureEncoder:
+    """ColumnTransformer replacement driven by precomputed index lookups
+
+    Raw input is a float matrix in the pipeline's input column order, with
+    categorical columns holding category codes (-1 for unknown). Numeric
+    columns go through a fill value and an affine transform; categorical
+    codes are scattered into one-hot output columns via a lookup table.
+    """
+
+    def __init__(self, input_columns, categories, num_in, num_out, num_fill, num_coef,
+                 num_offset, cat_in, cat_base, cat_map, n_outputs):
+        self.input_columns = list(input_columns)
+        self.categories = {column: list(values) for column, values in categories.items()}
+        self.num_in = np.asarray(num_in, dtype=np.int32)
+        self.num_out = np.asarray(num_out, dtype=np.int32)
+        self.num_fill = np.asarray(num_fill, dtype=np.float64)
+        self.num_coef = np.asarray(num_coef, dtype=np.float64)
+        self.num_offset = np.asarray(num_offset, dtype=np.float64)
+        self.cat_in = np.asarray(cat_in, dtype=np.int32)
+        self.cat_base = np.asarray(cat_base, dtype=np.int64)
+        self.cat_size = np.diff(np.append(self.cat_base, len(cat_map))).astype(np.int64)
+        self.cat_map = np.asarray(cat_map, dtype=np.int32)
+        self.n_outputs = int(n_outputs)
+        self._category_codes = {
+            column: {value: code for code, value in enumerate(values)}
+            for column, values in self.categories.items()
+        }
+
+    def encode_columns(self, columns):
+        """Convert a mapping of feature columns (a dict of arrays or a DataFrame) into the raw float matrix"""
+        first = columns[self.input_columns[0]]
+        raw = np.empty((len(first), len(self.input_columns)), dtype=np.float64)
+        for i, column in enumerate(self.input_columns):
+            if column in self._category_codes:
+                lookup = self._category_codes[column]
+                values, inverse = np.unique(np.asarray(columns[column], dtype=object), return_inverse=True)
+                raw[:, i] = np.array([lookup.get(value, -1) for value in values], dtype=np.float64)[inverse]
+            else:
+                raw[:, i] = np.asarray(columns[column], dtype=np.float64)
+        return raw
+
+    def transform(self, raw):
+        raw = np.asarray(raw, dtype=np.float64)
+        n = raw.shape[0]
+        out = np.zeros((n, self.n_outputs), dtype=np.float64)
+
+        if len(self.num_in):
+            values = raw[:, self.num_in]
+            values = np.where(np.isnan(values) & ~np.isnan(self.num_fill), self.num_fill, values)
+            out[:, self.num_out] = values * self.num_coef + self.num_offset
+
+        if len(self.cat_in):
+            codes = raw[:, self.cat_in]
+            valid = (codes >= 0) & (codes < self.cat_size)
+            flat = np.where(valid, codes, 0).astype(np.int64) + self.cat_base
+            columns = np.where(valid, self.cat_map[flat], -1)
+            rows, cols = np.nonzero(columns >= 0)
+            out[rows, columns[rows, cols]] = 1.0
+
+        return out
+
+class CompiledEnsemble:
+    """Compact replacement for the fitted preprocessing + VotingRegressor pipeline"""
+
+    def __init__(self, encoder, groups, weights, source_sha256=None):
+        self.encoder = encoder
+        self.groups = list(groups)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        # SHA-256 of the pickled pipeline this was exported (and verified) from
+        self.source_sha256 = source_sha256
+
+    def predict(self, X):
+        """Predict from feature columns (dict or DataFrame) or an already encoded raw float matrix"""
+        raw = X if isinstance(X, np.ndarray) else self.encoder.encode_columns(X)
+        transformed = self.encoder.transform(raw)
+        outputs = np.column_stack([group.predict(transformed) for group in self.groups])
+        return outputs @ self.weights / self.weights.sum()
+
+    def save(self, path):
+        arrays = {}
+        groups_meta = []
+        for i, group in enumerate(self.groups):
+            group_arrays, meta = group.to_arrays(f'group{i}_')
+            arrays.update(group_arrays)
+            groups_meta.append(meta)
+
+        encoder = self.encoder
+        for name in ('num_in', 'num_out', 'num_fill', 'num_coef', 'num_offset',
+                     'cat_in', 'cat_base', 'cat_map'):
+            arrays[f'encoder_{name}'] = getattr(encoder, name)
+        arrays['weights'] = self.weights
+
+        meta = {
+            'input_columns': encoder.input_columns,
+            'categories': encoder.categories,
+            'n_outputs': encoder.n_outputs,
+            'groups': groups_meta,
+            'source_sha256': self.source_sha256
+        }
+        np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        meta = json.loads(str(arrays['meta']))
+
+        encoder = FeatureEncoder(
+            input_columns=meta['input_columns'],
+            categories=meta['categories'],
+            n_outputs=meta['n_outputs'],
+            **{name: arrays[f'encoder_{name}']
+               for name in ('num_in', 'num_out', 'num_fill', 'num_coef', 'num_offset',
+                            'cat_in', 'cat_base', 'cat_map')}
+        )
+        groups = [
+            TreeGroup.from_arrays(arrays, f'group{i}_', group_meta)
+            for i, group_meta in enumerate(meta['groups'])
+        ]
+        return cls(encoder, groups, arrays['weights'], meta.get('source_sha256'))
+
+def _export_numeric_steps(transformer, n_columns):
+    """Fold imputers/scalers into per-column (fill, coef, offset) arrays"""
+    fill = np.full(n_columns, np.nan)
+    coef = np.ones(n_columns)
+    offset = np.zeros(n_columns)
+
+    steps = [step for _, step in transformer.steps] if hasattr(transformer, 'steps') else [transformer]
+    for step in steps:
+        step_name = type(step).__name__
+        if step == 'passthrough' or step is None:
+            continue
+        elif step_name == 'SimpleImputer':
+            if np.any(coef != 1) or np.any(offset != 0):
+                raise NotImplementedError("SimpleImputer after a scaler is not supported")
+            fill = np.asarray(step.statistics_, dtype=np.float64)
+        elif step_name == 'StandardScaler':
+            mean = step.mean_ if step.with_mean and step.mean_ is not None else np.zeros(n_columns)
+            scale = step.scale_ if step.with_std and step.scale_ is not None else np.ones(n_columns)
+            coef, offset = coef / scale, (offset - mean) / scale
+        elif step_name == 'MinMaxScaler':
+            if step.clip:
+                raise NotImplementedError("MinMaxScaler(clip=True) is not supported")
+            coef, offset = coef * step.scale_, offset * step.scale_ + step.min_
+        else:
+            raise NotImplementedError(f"Unsupported numeric transformer: {step_name}")
+
+    return fill, coef, offset
+
+def export_encoder(column_transformer):
+    """Export a fitted ColumnTransformer as a FeatureEncoder"""
+    input_columns = list(column_transformer.feature_names_in_)
+    column_index = {column: i for i, column in enumerate(input_columns)}
+
+    num_in, num_out, num_fill, num_coef, num_offset = [], [], [], [], []
+    cat_in, cat_base, cat_map = [], [], []
+    categories = {}
+    n_outputs = 0
+
+    for name, transformer, columns in column_transformer.transformers_:
+        if transformer == 'drop':
+            continue
+        if isinstance(columns, slice) or np.ndim(columns) == 0:
+            raise NotImplementedError(f"Unsupported column selector for {name}")
+        columns = [input_columns[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+        if not columns:
+            continue
+
+        if type(transformer).__name__ == 'OneHotEncoder':
+            if any(infrequent is not None for infrequent in getattr(transformer, 'infrequent_categories_', [])):
+                raise NotImplementedError("OneHotEncoder with infrequent categories is not supported")
+            drop_idx = getattr(transformer, 'drop_idx_', None)
+            for j, (column, column_categories) in enumerate(zip(columns, transformer.categories_)):
+                column_categories = list(column_categories)
+                categories[column] = [value.item() if isinstance(value, np.generic) else value
+                                      for value in column_categories]
+                cat_in.append(column_index[column])
+                cat_base.append(len(cat_map))
+                dropped = drop_idx[j] if drop_idx is not None else None
+                for k in range(len(column_categories)):
+                    if dropped is not None and k == dropped:
+                        cat_map.append(-1)
+                    else:
+                        cat_map.append(n_outputs)
+                        n_outputs += 1
+        else:
+            fill, coef, offset = _export_numeric_steps(transformer, len(columns))
+            for k, column in enumerate(columns):
+                num_in.append(column_index[column])
+                num_out.append(n_outputs)
+                num_fill.append(fill[k])
+                num_coef.append(coef[k])
+                num_offset.append(offset[k])
+                n_outputs += 1
+
+    return FeatureEncoder(input_columns, categories, num_in, num_out, num_fill, num_coef,
+                          num_offset, cat_in, cat_base, cat_map, n_outputs)
+
+def _export_sklearn_gb(estimator):
+    """Export a fitted sklearn GradientBoostingRegressor"""
+    init = estimator.init_
+    if isinstance(init, str) and init == 'zero':
+        bias = 0.0
+    elif type(init).__name__ == 'DummyRegressor':
+        bias = float(np.ravel(init.constant_)[0])
+    else:
+        raise NotImplementedError(f"Unsupported GradientBoosting init estimator: {type(init).__name__}")
+
+    builder = _TreeGroupBuilder()
+    for tree_estimator in estimator.estimators_[:, 0]:
+        tree = tree_estimator.tree_
+        offset = len(builder.feature)
+        for _ in range(tree.node_count):
+            builder.add_node()
+        missing_go_to_left = getattr(tree, 'missing_go_to_left', None)
+
+        depth = np.zeros(tree.node_count, dtype=int)
+        for node in range(tree.node_count):
+            left, right = tree.children_left[node], tree.children_right[node]
+            if left == -1:
+                builder.set_leaf(offset + node, float(tree.value[node, 0, 0]))
+                continue
+            depth[left] = depth[right] = depth[node] + 1
+            builder.set_split(
+                offset + node, int(tree.feature[node]), float(tree.threshold[node]),
+                offset + int(left), offset + int(right),
+                default_left=bool(missing_go_to_left[node]) if missing_go_to_left is not None else False,
+                missing_mode=MISSING_DEFAULT if missing_go_to_left is not None else MISSING_COMPARE
+            )
+        builder.roots.append(offset)
+        builder.max_depth = max(builder.max_depth, int(depth.max()))
+
+    # sklearn trees compare float32 features against float64 thresholds
+    return builder.build('gradient_boosting', strict=False, dtype=np.float32,
+                         bias=bias, scale=estimator.learning_rate)
+
+def _export_xgboost(estimator, zero_as_missing):
+    """Export a fitted XGBRegressor with a gbtree booster"""
+    booster = estimator.get_booster()
+    config = json.loads(booster.save_config())
+    learner = config['learner']
+
+    objective = learner['objective']['name']
+    if objective not in XGBOOST_IDENTITY_OBJECTIVES:
+        raise NotImplementedError(f"Unsupported XGBoost objective: {objective}")
+    if learner['gradient_booster']['name'] != 'gbtree':
+        raise NotImplementedError(f"Unsupported XGBoost booster: {learner['gradient_booster']['name']}")
+
+    base_score = learner['learner_model_param']['base_score'].strip('[]').split(',')[0]
+    feature_names = booster.feature_names or []
+    feature_index = {name: i for i, name in enumerate(feature_names)}
+
+    dumps = booster.get_dump(dump_format='json')
+    try:
+        best_iteration = estimator.best_iteration
+    except AttributeError:
+        best_iteration = None
+    if best_iteration is not None:
+        trees_per_iteration = int(learner['gradient_booster']['gbtree_model_param'].get('num_parallel_tree', 1))
+        dumps = dumps[:(best_iteration + 1) * trees_per_iteration]
+
+    builder = _TreeGroupBuilder()
+    for dump in dumps:
+        root = json.loads(dump)
+        builder.roots.append(_add_xgboost_tree(builder, root, feature_index))
+
+    return builder.build('xgboost', strict=True, dtype=np.float32,
+                         bias=float(base_score), zero_as_missing=zero_as_missing)
+
+def _add_xgboost_tree(builder, root, feature_index):
+    root_index = builder.add_node()
+    stack = [(root, root_index, 0)]
+    while stack:
+        node, index, depth = stack.pop()
+        builder.max_depth = max(builder.max_depth, depth)
+        if 'leaf' in node:
+            builder.set_leaf(index, float(node['leaf']))
+            continue
+        if isinstance(node.get('split_condition'), list) or 'categories' in node:
+            raise NotImplementedError("Categorical XGBoost splits are not supported")
+
+        children = {child['nodeid']: child for child in node['children']}
+        left_index, right_index = builder.add_node(), builder.add_node()
+        split = node['split']
+        feature = feature_index[split] if split in feature_index else int(split.lstrip('f'))
+        builder.set_split(index, feature, float(node['split_condition']), left_index, right_index,
+                          default_left=node['missing'] == node['yes'], missing_mode=MISSING_DEFAULT)
+        stack.append((children[node['yes']], left_index, depth + 1))
+        stack.append((children[node['no']], right_index, depth + 1))
+    return root_index
+
+def _export_lightgbm(estimator):
+    """Export a fitted LGBMRegressor"""
+    dump = estimator.booster_.dump_model()
+    objective = dump.get('objective', '').split(' ')[0]
+    if objective not in LIGHTGBM_IDENTITY_OBJECTIVES:
+        raise NotImplementedError(f"Unsupported LightGBM objective: {objective}")
+
+    builder = _TreeGroupBuilder()
+    for tree_info in dump['tree_info']:
+        builder.roots.append(_add_lightgbm_tree(builder, tree_info['tree_structure']))
+
+    scale = 1.0 / len(dump['tree_info']) if dump.get('average_output') else 1.0
+    return builder.build('lightgbm', strict=False, dtype=np.float64, scale=scale)
+
+def _add_lightgbm_tree(builder, root):
+    missing_modes = {'None': MISSING_AS_ZERO, 'Zero': MISSING_ZERO_DEFAULT, 'NaN': MISSING_DEFAULT}
+
+    root_index = builder.add_node()
+    stack = [(root, root_index, 0)]
+    while stack:
+        node, index, depth = stack.pop()
+        builder.max_depth = max(builder.max_depth, depth)
+        if 'leaf_value' in node:
+            builder.set_leaf(index, float(node['leaf_value']))
+            continue
+        if node['decision_type'] != '<=':
+            raise NotImplementedError("Categorical LightGBM splits are not supported")
+
+        left_index, right_index = builder.add_node(), builder.add_node()
+        builder.set_split(index, int(node['split_feature']), float(node['threshold']),
+                          left_index, right_index, default_left=bool(node['default_left']),
+                          missing_mode=missing_modes[node.get('missing_type', 'None')])
+        stack.append((node['left_child'], left_index, depth + 1))
+        stack.append((node['right_child'], right_index, depth + 1))
+    return root_index
+
+def _export_regressor(estimator, zero_as_missing):
+    estimator_name = type(estimator).__name__
+    if estimator_name == 'GradientBoostingRegressor':
+        return _export_sklearn_gb(estimator)
+    elif estimator_name == 'XGBRegressor':
+        return _export_xgboost(estimator, zero_as_missing)
+    elif estimator_name == 'LGBMRegressor':
+        return _export_lightgbm(estimator)
+    raise NotImplementedError(f"Unsupported regressor: {estimator_name}")
+
+def export_pipeline(pipeline):
+    """Export a fitted ColumnTransformer + tree-ensemble pipeline as a CompiledEnsemble"""
+    steps = [step for _, step in pipeline.steps if step not in ('passthrough', None)]
+    if len(steps) != 2 or type(steps[0]).__name__ != 'ColumnTransformer':
+        raise NotImplementedError("Expected a ColumnTransformer followed by a regressor")
+    column_transformer, regressor = steps
+
+    encoder = export_encoder(column_transformer)
+    # XGBoost treats the implicit zeros of sparse input as missing values
+    zero_as_missing = bool(getattr(column_transformer, 'sparse_output_', False))
+
+    if type(regressor).__name__ == 'VotingRegressor':
+        weights = getattr(regressor, '_weights_not_none', None)
+        estimators = regressor.estimators_
+        weights = np.ones(len(estimators)) if weights is None else np.asarray(weights, dtype=float)
+        groups = [_export_regressor(estimator, zero_as_missing) for estimator in estimators]
+    else:
+        weights = np.ones(1)
+        groups = [_export_regressor(regressor, zero_as_missing)]
+
+    return CompiledEnsemble(encoder, groups, weights)
+
+def verify_compiled(pipeline, compiled, frame, rtol=1e-4, atol=1e-3):
+    """Check the compiled ensemble against the original pipeline on a sample frame"""
+    expected = np.asarray(pipeline.predict(frame), dtype=np.float64)
+    actual = compiled.predict(frame)
+    max_error = float(np.max(np.abs(expected - actual))) if len(expected) else 0.0
+    if not np.allclose(actual, expected, rtol=rtol, atol=atol):
+        raise ValueError(f"Compiled model differs from pipeline (max abs error {max_error:.6f})")
+    return max_error
+
+if __name__ == '__main__':
+    from model import MODEL_PATH, export_compiled_model
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else MODEL_PATH
+    output_path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    compiled, output_path, max_error = export_compiled_model(model_path, output_path)
+    print(f"Exported {sum(len(group.roots) for group in compiled.groups)} trees to {output_path} "
+          f"(max abs error {max_error:.6f})")
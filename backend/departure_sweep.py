@@ -0,0 +1,53 @@
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MINUTES_PER_DAY = 24 * 60
+
+def parse_clock(value):
+    """Minutes past midnight for an 'HH:MM' string, raising ValueError if malformed"""
+    try:
+        hour, minute = (int(part) for part in str(value).split(':'))
+    except ValueError:
+        raise ValueError(f"Invalid time {value!r} (expected HH:MM)")
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"Invalid time {value!r} (expected HH:MM)")
+    return hour * 60 + minute
+
+def format_clock(minutes):
+    return f'{(minutes // 60) % 24:02d}:{minutes % 60:02d}'
+
+def departure_slots(day_of_week, window_start, window_end, step_minutes, max_slots):
+    """(day_of_week, 'HH:MM') for every departure from window_start to window_end inclusive
+
+    A window that ends at or before its start runs past midnight, and
+    slots after midnight fall on the next day.
+    """
+    day = str(day_of_week).capitalize()
+    if day not in DAYS:
+        raise ValueError(f"Invalid day_of_week {day_of_week!r}")
+    if not 1 <= step_minutes <= MINUTES_PER_DAY:
+        raise ValueError("step_minutes must be between 1 and 1440")
+
+    start, end = parse_clock(window_start), parse_clock(window_end)
+    if end <= start:
+        end += MINUTES_PER_DAY
+    count = (end - start) // step_minutes + 1
+    if count > max_slots:
+        raise ValueError(f"Too many departure slots ({count}, max {max_slots}); use a larger step_minutes")
+
+    first_day = DAYS.index(day)
+    return [
+        (DAYS[(first_day + minutes // MINUTES_PER_DAY) % 7], format_clock(minutes))
+        for minutes in range(start, end + 1, step_minutes)
+    ]
+
+def summarize_sweep(slots, predictions, top):
+    """The ETA curve for each slot and the `top` quickest departures, earliest first on ties"""
+    curve = []
+    for (day, departure), predicted in zip(slots, predictions):
+        curve.append({
+            'day_of_week': day,
+            'departure_time': departure,
+            'predicted_time': predicted,
+            'arrival_time': format_clock(parse_clock(departure) + int(predicted))
+        })
+    best = sorted(range(len(curve)), key=lambda index: (curve[index]['predicted_time'], index))[:top]
+    return curve, [curve[index] for index in best]
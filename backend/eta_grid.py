@@ -0,0 +1,286 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; builds then aren't coordinated across processes
+    fcntl = None
+
+from departure_sweep import DAYS
+from model import predict_distance_profiles, get_model_version
+from utils import distance_matrix
+
+logger = logging.getLogger(__name__)
+
+# Service area as "south,west,north,east" in degrees (Bengaluru by default)
+ETA_GRID_BBOX = os.environ.get('ETA_GRID_BBOX', '12.80,77.45,13.10,77.80')
+ETA_GRID_CELL_KM = float(os.environ.get('ETA_GRID_CELL_KM', 2.0))
+# Pair distances are rounded to this step so each distinct distance is scored once per bucket
+ETA_GRID_DISTANCE_STEP_KM = float(os.environ.get('ETA_GRID_DISTANCE_STEP_KM', 0.1))
+# Grids are tens of MB, so they are kept in the user's cache directory rather than the checkout
+ETA_GRID_DIR = os.environ.get(
+    'ETA_GRID_DIR',
+    os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'commute-predictor', 'eta_grid')
+)
+# Rebuild when the grid is older than this or the model changed (0 disables the background job)
+ETA_GRID_REFRESH_SECONDS = int(os.environ.get('ETA_GRID_REFRESH_SECONDS', 24 * 3600))
+
+# One bucket per (day, hour), the resolution the model sees
+HOURS_PER_DAY = 24
+N_BUCKETS = len(DAYS) * HOURS_PER_DAY
+KM_PER_DEGREE = 111.32
+MAX_MINUTES = np.iinfo(np.uint16).max
+INDEX_FILE = 'index.json'
+LOCK_FILE = 'build.lock'
+
+def parse_bbox(value):
+    """(south, west, north, east) from a comma-separated string or sequence"""
+    parts = value.split(',') if isinstance(value, str) else value
+    south, west, north, east = (float(part) for part in parts)
+    if south >= north or west >= east:
+        raise ValueError(f"Invalid bounding box {value!r}")
+    return south, west, north, east
+
+def bucket_index(day_of_week, hour):
+    """Bucket for a day name and hour, raising ValueError if either is invalid"""
+    day = str(day_of_week).capitalize()
+    if day not in DAYS:
+        raise ValueError(f"Invalid day_of_week {day_of_week!r}")
+    hour = int(hour)
+    if not 0 <= hour < HOURS_PER_DAY:
+        raise ValueError(f"Invalid hour {hour} (expected 0-23)")
+    return DAYS.index(day) * HOURS_PER_DAY + hour
+
+class GridSpec:
+    """Square zones of roughly cell_km over a bounding box, numbered row-major from the south-west"""
+
+    def __init__(self, bbox, cell_km):
+        self.bbox = parse_bbox(bbox)
+        self.cell_km = float(cell_km)
+        south, west, north, east = self.bbox
+        self.lat_step = self.cell_km / KM_PER_DEGREE
+        self.lng_step = self.cell_km / (KM_PER_DEGREE * math.cos(math.radians((south + north) / 2)))
+        self.rows = max(1, math.ceil((north - south) / self.lat_step))
+        self.cols = max(1, math.ceil((east - west) / self.lng_step))
+        self.cells = self.rows * self.cols
+
+    def cell_indices(self, points):
+        """Zone of each (lat, lng) point, or -1 outside the grid"""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        south, west, north, east = self.bbox
+        rows = np.floor((points[:, 0] - south) / self.lat_step).astype(np.int64)
+        cols = np.floor((points[:, 1] - west) / self.lng_step).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+        return np.where(inside, rows * self.cols + cols, -1)
+
+    def centroids(self):
+        """(cells, 2) array of zone centre (lat, lng) pairs"""
+        south, west, _, _ = self.bbox
+        rows, cols = np.divmod(np.arange(self.cells), self.cols)
+        return np.column_stack([south + (rows + 0.5) * self.lat_step, west + (cols + 0.5) * self.lng_step])
+
+def build_grid(directory=ETA_GRID_DIR, bbox=ETA_GRID_BBOX, cell_km=ETA_GRID_CELL_KM,
+               distance_step=ETA_GRID_DISTANCE_STEP_KM):
+    """Score every zone pair for every bucket and publish the grid in directory; returns its metadata"""
+    started = time.time()
+    spec = GridSpec(bbox, cell_km)
+
+    distances = distance_matrix(spec.centroids(), spec.centroids(), noise=0.0)
+    # Trips that start and end in the same zone cover about half a cell
+    np.fill_diagonal(distances, spec.cell_km / 2)
+    steps = np.maximum(np.rint(distances / distance_step).astype(np.int64), 1)
+    unique_steps, pair_profile = np.unique(steps, return_inverse=True)
+    pair_profile = pair_profile.reshape(steps.shape)
+
+    os.makedirs(directory, exist_ok=True)
+    name = f'eta_grid-{time.time_ns()}.npy'
+    path = os.path.join(directory, name)
+    etas = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=np.uint16,
+                                     shape=(N_BUCKETS, spec.cells, spec.cells))
+    hours = np.arange(HOURS_PER_DAY)
+    for day_index, day in enumerate(DAYS):
+        # One model call per day covering every hour and every distinct pair distance
+        profiles = predict_distance_profiles([day] * HOURS_PER_DAY, hours, unique_steps * distance_step)
+        profiles = np.clip(profiles, 0, MAX_MINUTES).astype(np.uint16)
+        etas[day_index * HOURS_PER_DAY:(day_index + 1) * HOURS_PER_DAY] = profiles[:, pair_profile]
+    etas.flush()
+    del etas
+    os.replace(path + '.tmp', path)
+
+    meta = {
+        'file': name,
+        'bbox': list(spec.bbox),
+        'cell_km': spec.cell_km,
+        'rows': spec.rows,
+        'cols': spec.cols,
+        'cells': spec.cells,
+        'buckets': N_BUCKETS,
+        'distance_step_km': distance_step,
+        'distinct_distances': len(unique_steps),
+        'model_version': get_model_version().get('version'),
+        'built_at': datetime.now().isoformat(),
+        'built_ts': time.time(),
+        'build_seconds': round(time.time() - started, 3)
+    }
+    index_path = os.path.join(directory, INDEX_FILE)
+    with open(index_path + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(index_path + '.tmp', index_path)
+
+    # Processes still mapping an older grid keep reading it until they reopen
+    for entry in os.listdir(directory):
+        if entry.startswith('eta_grid-') and entry != name:
+            try:
+                os.remove(os.path.join(directory, entry))
+            except OSError:
+                pass
+
+    logger.info("Built ETA grid: %d zones, %d buckets in %.1fs", spec.cells, N_BUCKETS, meta['build_seconds'])
+    return meta
+
+class EtaGrid:
+    """A published grid: zone geometry plus a read-only bucket x origin x destination array of minutes"""
+
+    def __init__(self, directory, meta):
+        self.meta = meta
+        self.spec = GridSpec(meta['bbox'], meta['cell_km'])
+        self.etas = np.load(os.path.join(directory, meta['file']), mmap_mode='r')
+
+    def lookup(self, origins, destinations, day_of_week, hour):
+        """Minutes between paired (lat, lng) points, None where either falls outside the grid"""
+        bucket = bucket_index(day_of_week, hour)
+        origin_cells = self.spec.cell_indices(origins)
+        dest_cells = self.spec.cell_indices(destinations)
+        inside = (origin_cells >= 0) & (dest_cells >= 0)
+        minutes = self.etas[bucket, np.where(inside, origin_cells, 0), np.where(inside, dest_cells, 0)]
+        return [int(value) if ok else None for value, ok in zip(minutes, inside)]
+
+    def tile(self, origin, day_of_week, hour):
+        """(origin zone, minutes to every zone) for a heat map, or (-1, None) outside the grid"""
+        bucket = bucket_index(day_of_week, hour)
+        cell = int(self.spec.cell_indices([origin])[0])
+        if cell < 0:
+            return cell, None
+        return cell, self.etas[bucket, cell]
+
+class EtaGridStore:
+    """Serves the latest grid in a directory, picking up rebuilds made by any process"""
+
+    def __init__(self, directory=ETA_GRID_DIR, check_interval=5.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._grid = None
+        self._index_mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """The open grid, or None if none has been built yet"""
+        if time.monotonic() >= self._next_check:
+            self.refresh()
+        return self._grid
+
+    def refresh(self):
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                mtime = os.stat(os.path.join(self.directory, INDEX_FILE)).st_mtime_ns
+                if mtime == self._index_mtime:
+                    return
+                with open(os.path.join(self.directory, INDEX_FILE)) as f:
+                    meta = json.load(f)
+                self._grid = EtaGrid(self.directory, meta)
+                self._index_mtime = mtime
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error("Error opening ETA grid: %s", e)
+
+class EtaGridJob:
+    """Background thread that rebuilds the grid when it is missing, stale or from another model
+
+    A lock file keeps several server processes from building at once; the
+    others pick up the new grid through their store.
+    """
+
+    def __init__(self, store, refresh_seconds=ETA_GRID_REFRESH_SECONDS, check_interval=300.0,
+                 bbox=ETA_GRID_BBOX, cell_km=ETA_GRID_CELL_KM, distance_step=ETA_GRID_DISTANCE_STEP_KM):
+        self.store = store
+        self.refresh_seconds = refresh_seconds
+        self.check_interval = check_interval
+        self.spec = GridSpec(bbox, cell_km)
+        self.distance_step = distance_step
+        self._thread = None
+        self._stop = threading.Event()
+        self._stats = {'builds': 0, 'skipped': 0, 'building': False, 'last_error': None}
+
+    def start(self):
+        if self._thread is None and self.refresh_seconds > 0:
+            self._thread = threading.Thread(target=self._run, name='eta-grid-builder', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return dict(self._stats)
+
+    def is_stale(self):
+        grid = self.store.current()
+        if grid is None:
+            return True
+        meta = grid.meta
+        if list(self.spec.bbox) != meta['bbox'] or self.spec.cell_km != meta['cell_km'] \
+                or self.distance_step != meta['distance_step_km']:
+            return True
+        if time.time() - meta['built_ts'] > self.refresh_seconds:
+            return True
+        model_version = get_model_version().get('version')
+        return model_version is not None and model_version != meta['model_version']
+
+    def run_once(self):
+        """Rebuild the grid if it is stale; returns True if this call built it"""
+        if not self.is_stale():
+            return False
+
+        os.makedirs(self.store.directory, exist_ok=True)
+        with open(os.path.join(self.store.directory, LOCK_FILE), 'w') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    self._stats['skipped'] += 1
+                    return False
+            # Another process may have finished a build while we waited
+            self.store.refresh()
+            if not self.is_stale():
+                return False
+
+            self._stats['building'] = True
+            try:
+                build_grid(self.store.directory, self.spec.bbox, self.spec.cell_km, self.distance_step)
+                self._stats['builds'] += 1
+                self._stats['last_error'] = None
+            finally:
+                self._stats['building'] = False
+        self.store.refresh()
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self._stats['last_error'] = str(e)
+                logger.error("Error building ETA grid: %s", e)
+            self._stop.wait(self.check_interval)
+
+if __name__ == '__main__':
+    print(json.dumps(build_grid(), indent=2))
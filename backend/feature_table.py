@@ -0,0 +1,174 @@
+import numpy as np
+
+# Route/area types with their own factors; anything else maps to OTHER_ROUTE
+ROUTE_TYPES = ('IT Hub', 'Commercial', 'Mixed', 'Residential')
+OTHER_ROUTE = len(ROUTE_TYPES)
+ROUTE_INDEX = {route_type: i for i, route_type in enumerate(ROUTE_TYPES)}
+
+# Distance buckets: <5, 5-10, 10-15, >=15 km, plus one for an unknown distance
+DISTANCE_EDGES = np.array([5.0, 10.0, 15.0])
+UNKNOWN_DISTANCE = len(DISTANCE_EDGES) + 1
+
+WEEKEND_DAYS = ('saturday', 'sunday')
+
+def _traffic_multiplier(hour_of_day, is_weekend, route_type, distance_km):
+    """Deterministic part of the traffic multiplier (before random variation)"""
+    # Distance-based base multiplier
+    if distance_km < 5:
+        traffic_multiplier = 1.3  # Short routes have more stops/turns
+    elif distance_km < 10:
+        traffic_multiplier = 1.2
+    elif distance_km < 15:
+        traffic_multiplier = 1.1
+    else:
+        traffic_multiplier = 1.0  # Long routes often use highways
+
+    morning_peak = (hour_of_day >= 7 and hour_of_day <= 10)
+    evening_peak = (hour_of_day >= 17 and hour_of_day <= 20)
+    is_peak_hour = morning_peak or evening_peak
+
+    route_multipliers = {
+        'IT Hub': 1.3,
+        'Commercial': 1.2,
+        'Mixed': 1.25,
+        'Residential': 1.1
+    }
+    route_multiplier = route_multipliers.get(route_type, 1.2)
+
+    if is_peak_hour:
+        if is_weekend:
+            traffic_multiplier += 0.4 if distance_km < 10 else 0.3  # Short routes more affected
+        else:
+            traffic_multiplier += 0.9 if distance_km < 10 else 0.7  # Short routes heavily affected during weekday peaks
+    elif hour_of_day <= 5 or hour_of_day >= 22:  # Night hours
+        traffic_multiplier -= 0.4
+    elif is_weekend:
+        traffic_multiplier += 0.3 if distance_km < 10 else 0.2
+
+    traffic_multiplier *= route_multiplier
+
+    # Time of day variation
+    if morning_peak:
+        traffic_multiplier *= 1.2
+    elif evening_peak:
+        traffic_multiplier *= 1.3
+
+    return traffic_multiplier
+
+def _road_complexity(distance, area_type):
+    """Road complexity factor based on distance and area type"""
+    # Base complexity (roads are never straight) plus distance-based complexity
+    if distance < 5:  # Short urban routes have more turns
+        complexity = 1.2 + 0.3
+    elif distance < 10:
+        complexity = 1.2 + 0.25
+    elif distance < 15:
+        complexity = 1.2 + 0.2
+    else:  # Longer routes tend to use highways more
+        complexity = 1.2 + 0.15
+
+    area_factors = {
+        'IT Hub': 1.1,  # More direct routes
+        'Commercial': 1.2,  # More intersections
+        'Residential': 1.25,  # More turns and small roads
+        'Mixed': 1.15  # Moderate complexity
+    }
+    return complexity * area_factors.get(area_type, 1.0)
+
+# Base speeds (km/h) per route type for short, medium and long routes
+_SPEEDS = {
+    'short': {'IT Hub': 22, 'Commercial': 25, 'Mixed': 23, 'Residential': 30},
+    'medium': {'IT Hub': 28, 'Commercial': 32, 'Mixed': 30, 'Residential': 35},
+    'long': {'IT Hub': 35, 'Commercial': 40, 'Mixed': 38, 'Residential': 45}
+}
+_BUCKET_SPEED_TABLE = ('short', 'medium', 'medium', 'long', 'medium')
+_BUCKET_SPEED_BOUNDS = ((10, 40), (15, 50), (15, 50), (20, 60), (15, 50))
+
+# Representative distance for each bucket when building the tables
+_BUCKET_DISTANCES = (0.0, 5.0, 10.0, 15.0)
+_ROUTE_KEYS = ROUTE_TYPES + (None,)
+
+TRAFFIC_MULTIPLIER = np.array([
+    [[[_traffic_multiplier(hour, bool(weekend), route_type, distance)
+       for distance in _BUCKET_DISTANCES]
+      for route_type in _ROUTE_KEYS]
+     for weekend in (0, 1)]
+    for hour in range(24)
+])  # [hour, is_weekend, route, distance bucket]
+
+ROAD_COMPLEXITY = np.array([
+    [_road_complexity(distance, route_type) for distance in _BUCKET_DISTANCES]
+    for route_type in _ROUTE_KEYS
+])  # [route, distance bucket]
+
+BASE_SPEED = np.array([
+    [_SPEEDS[table].get(route_type, 30) for table in _BUCKET_SPEED_TABLE]
+    for route_type in _ROUTE_KEYS
+], dtype=float)  # [route, distance bucket incl. unknown]
+
+MIN_SPEED = np.array([bounds[0] for bounds in _BUCKET_SPEED_BOUNDS], dtype=float)
+
+# Time-based speed adjustments: faster at night, slower at peak hours
+SPEED_HOUR_FACTOR = np.array([
+    1.3 if hour >= 22 or hour <= 5 else (0.7 if hour in (7, 8, 9, 17, 18, 19) else 1.0)
+    for hour in range(24)
+])
+MAX_SPEED = np.array([
+    [bounds[1] * (1.2 if hour >= 22 or hour <= 5 else (0.8 if hour in (7, 8, 9, 17, 18, 19) else 1.0))
+     for bounds in _BUCKET_SPEED_BOUNDS]
+    for hour in range(24)
+])  # [hour, distance bucket incl. unknown]
+
+def route_type_index(route_types):
+    """Map route/area type names to table indices"""
+    return np.array([ROUTE_INDEX.get(route_type, OTHER_ROUTE) for route_type in route_types], dtype=np.intp)
+
+def distance_bucket(distances):
+    """Map distances in km to bucket indices; None/NaN maps to UNKNOWN_DISTANCE"""
+    distances = np.asarray(distances, dtype=float)
+    buckets = np.searchsorted(DISTANCE_EDGES, distances, side='right')
+    return np.where(np.isnan(distances), UNKNOWN_DISTANCE, buckets)
+
+def weekend_flags(day_names):
+    return np.isin(np.char.lower(np.asarray(day_names).astype(str)), WEEKEND_DAYS)
+
+def traffic_multipliers(hours, is_weekend, route_types, distances, noise=None):
+    """Traffic multipliers for many trips with vectorized random variation
+
+    noise holds one uniform [0, 1) draw per trip; fresh draws are used if omitted.
+    """
+    hours = np.asarray(hours, dtype=np.intp)
+    base = TRAFFIC_MULTIPLIER[
+        hours,
+        np.asarray(is_weekend, dtype=np.intp),
+        route_type_index(route_types),
+        np.minimum(distance_bucket(distances), len(DISTANCE_EDGES))
+    ]
+    noise = np.random.random(len(hours)) if noise is None else np.asarray(noise, dtype=float)
+    return base * (1 + (noise * 0.2 - 0.1))
+
+def average_speeds(multipliers, route_types, distances, hour, noise=None):
+    """Average speeds for many trips given their traffic multipliers
+
+    hour is the hour used for the time-based adjustment; noise holds one
+    uniform [0, 1) draw per trip for the weather factor.
+    """
+    multipliers = np.asarray(multipliers, dtype=float)
+    buckets = distance_bucket(distances)
+
+    speeds = BASE_SPEED[route_type_index(route_types), buckets] / multipliers * SPEED_HOUR_FACTOR[hour]
+
+    # Weather impact (simplified - could be expanded with real weather data)
+    noise = np.random.random(len(multipliers)) if noise is None else np.asarray(noise, dtype=float)
+    speeds = speeds * (1.0 + (noise * 0.1 - 0.05))
+
+    speeds = np.maximum(MIN_SPEED[buckets], np.minimum(speeds, MAX_SPEED[hour, buckets]))
+    return np.round(speeds, 2)
+
+def road_complexity(distances, area_types):
+    """Road complexity factors for many distances and area types"""
+    distances = np.asarray(distances, dtype=float)
+    return ROAD_COMPLEXITY[
+        route_type_index(np.broadcast_to(np.asarray(area_types, dtype=object), distances.shape).ravel()).reshape(distances.shape),
+        np.minimum(distance_bucket(distances), len(DISTANCE_EDGES))
+    ]
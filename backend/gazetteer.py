@@ -0,0 +1,183 @@
+import csv
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+
+from geocoding import normalize_address
+
+logger = logging.getLogger(__name__)
+
+# Place names with coordinates, as name,city,lat,lng[,score][,area_type] rows
+GAZETTEER_PATH = os.environ.get('GAZETTEER_PATH', os.path.join('data', 'gazetteer.csv'))
+# Places learned from Mapbox answers are appended here so they survive restarts (unset to keep them in memory)
+GAZETTEER_LEARNED_PATH = os.environ.get('GAZETTEER_LEARNED_PATH')
+GAZETTEER_MAX_ENTRIES = int(os.environ.get('GAZETTEER_MAX_ENTRIES', 100000))
+# Learned places expire like geocode cache entries, so Mapbox is asked again eventually
+GAZETTEER_LEARNED_TTL = int(os.environ.get('GAZETTEER_LEARNED_TTL', os.environ.get('GEOCODE_CACHE_TTL', 7 * 24 * 3600)))
+
+# Prefix matches examined per autocomplete query before ranking
+MAX_PREFIX_SCAN = 1000
+
+class Gazetteer:
+    """In-process place-name index for exact geocoding and prefix autocomplete
+
+    Names are normalized like geocoding cache keys and kept in a sorted list,
+    so an exact lookup is a dict hit and a prefix query is a bisect plus a
+    scan of the matching run. Coordinates are (longitude, latitude), as
+    Mapbox returns them. Places resolved by Mapbox can be learned at runtime;
+    they expire after learned_ttl seconds and are never offered by
+    autocomplete, which only lists the curated dataset.
+    """
+
+    def __init__(self, max_entries=100000, learned_path=None, learned_ttl=7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.learned_path = learned_path
+        self.learned_ttl = learned_ttl
+        self._entries = {}  # key -> [display name, (lng, lat), score, expiry time or None]
+        self._keys = []
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'learned': 0, 'autocomplete': 0}
+
+    def load(self, path):
+        """Add places from a name,city,lat,lng[,score[,learned_at]] CSV; returns the number of rows read
+
+        Rows with learned_at were learned at runtime and expire learned_ttl
+        seconds after it; expired ones are skipped.
+        """
+        count = 0
+        now = time.time()
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    coordinates = (float(row['lng']), float(row['lat']))
+                    score = float(row.get('score') or 0)
+                    expires_at = float(row['learned_at']) + self.learned_ttl if row.get('learned_at') else None
+                except (KeyError, TypeError, ValueError):
+                    logger.warning("Skipping malformed gazetteer row: %s", row)
+                    continue
+                if expires_at is not None and expires_at <= now:
+                    continue
+                name, city = row['name'].strip(), (row.get('city') or '').strip()
+                self.add(name, coordinates, score, expires_at)
+                if city:
+                    self.add(f'{name}, {city}', coordinates, score, expires_at)
+                count += 1
+        return count
+
+    def add(self, name, coordinates, score=0.0, expires_at=None):
+        """Add or update a place; returns False if the index is full"""
+        key = normalize_address(name)
+        if not key:
+            return False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] = tuple(coordinates)
+                entry[2] = max(entry[2], score)
+                # A curated place stays curated; a learned one gets a fresh expiry
+                if entry[3] is not None:
+                    entry[3] = expires_at
+                return True
+            if len(self._entries) >= self.max_entries:
+                return False
+            self._entries[key] = [name, tuple(coordinates), score, expires_at]
+            insort(self._keys, key)
+            return True
+
+    def learn(self, label, coordinates):
+        """Remember a place by the provider's canonical name (never the user's query text)"""
+        key = normalize_address(label or '')
+        with self._lock:
+            entry = self._entries.get(key)
+            known = entry is not None and (entry[3] is None or entry[3] > time.time())
+        if not key or known:
+            return
+        learned_at = time.time()
+        if self.add(label, coordinates, expires_at=learned_at + self.learned_ttl):
+            self._append_learned(label, coordinates, learned_at)
+            with self._lock:
+                self._stats['learned'] += 1
+
+    def lookup(self, address):
+        """(longitude, latitude) for an exactly matching place, or None"""
+        key = normalize_address(address)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[3] is not None and entry[3] <= time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            # Places people actually ask for rank higher in autocomplete
+            entry[2] += 1
+            return entry[1]
+
+    def autocomplete(self, prefix, limit=5):
+        """Up to `limit` places whose name starts with prefix, most popular first"""
+        key = normalize_address(prefix)
+        if not key:
+            return []
+        with self._lock:
+            self._stats['autocomplete'] += 1
+            matches = []
+            index = bisect_left(self._keys, key)
+            while index < len(self._keys) and len(matches) < MAX_PREFIX_SCAN:
+                candidate = self._keys[index]
+                if not candidate.startswith(key):
+                    break
+                entry = self._entries[candidate]
+                # Learned places come from other users' lookups; keep them private
+                if entry[3] is None:
+                    matches.append((candidate, entry))
+                index += 1
+
+        matches.sort(key=lambda match: (-match[1][2], len(match[0]), match[0]))
+        results, seen = [], set()
+        for _, (name, (lng, lat), _score, _expires_at) in matches:
+            # "Whitefield" and "Whitefield, Bengaluru" are the same place; list it once
+            if (lng, lat) in seen:
+                continue
+            seen.add((lng, lat))
+            results.append({'name': name, 'lat': lat, 'lng': lng})
+            if len(results) >= limit:
+                break
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'size': len(self._entries)}
+
+    def _remove(self, key):
+        # Called with the lock held
+        del self._entries[key]
+        del self._keys[bisect_left(self._keys, key)]
+
+    def _append_learned(self, name, coordinates, learned_at):
+        if not self.learned_path:
+            return
+        try:
+            write_header = not os.path.exists(self.learned_path)
+            with open(self.learned_path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if write_header:
+                    writer.writerow(['name', 'city', 'lat', 'lng', 'score', 'learned_at'])
+                writer.writerow([name, '', coordinates[1], coordinates[0], 0, round(learned_at)])
+        except OSError as e:
+            logger.error("Error saving learned place: %s", e)
+
+def load_gazetteer(path=GAZETTEER_PATH, learned_path=GAZETTEER_LEARNED_PATH, max_entries=GAZETTEER_MAX_ENTRIES,
+                   learned_ttl=GAZETTEER_LEARNED_TTL):
+    """Build the gazetteer from the bundled dataset plus any previously learned places"""
+    gazetteer = Gazetteer(max_entries=max_entries, learned_path=learned_path, learned_ttl=learned_ttl)
+    for source in (path, learned_path):
+        if not source or not os.path.exists(source):
+            continue
+        try:
+            logger.info("Loaded %d places from %s", gazetteer.load(source), source)
+        except (OSError, csv.Error) as e:
+            logger.error("Error loading gazetteer %s: %s", source, e)
+    return gazetteer
@@ -0,0 +1,317 @@
+import asyncio
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+MAPBOX_GEOCODING_URL = 'https://api.mapbox.com/geocoding/v5/mapbox.places'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Mapbox feature types the gazetteer may learn
+LEARNABLE_PLACE_TYPES = frozenset(['place', 'locality'])
+
+def normalize_address(address):
+    """Normalize an address so equivalent spellings share a cache key"""
+    address = unicodedata.normalize('NFKC', address).lower().strip()
+    address = re.sub(r'\s*,\s*', ', ', address)
+    return re.sub(r'\s+', ' ', address)
+
+class GeocodeCache:
+    """LRU cache for geocoding results with TTLs and an optional SQLite tier
+
+    Results are stored as (longitude, latitude) tuples. Addresses that could
+    not be found are cached as None for a shorter negative TTL.
+    """
+
+    def __init__(self, max_entries=1024, ttl=86400, negative_ttl=600, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'negative_hits': 0, 'disk_hits': 0, 'evictions': 0}
+        self._db = None
+
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS geocode_cache ('
+                    'key TEXT PRIMARY KEY, lng REAL, lat REAL, expires_at REAL NOT NULL)'
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error opening geocode cache database {db_path}: {str(e)}")
+                self._db = None
+
+    def get(self, address):
+        """Return (found, coordinates) for a cached address"""
+        key = normalize_address(address)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                entry = self._load_from_disk(key, now)
+                if entry is not None:
+                    self._stats['disk_hits'] += 1
+                    self._store_in_memory(key, entry)
+
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            if entry[1] is None:
+                self._stats['negative_hits'] += 1
+            return True, entry[1]
+
+    def set(self, address, coordinates):
+        """Cache coordinates for an address, or None if it could not be found"""
+        key = normalize_address(address)
+        ttl = self.ttl if coordinates is not None else self.negative_ttl
+        entry = (time.time() + ttl, tuple(coordinates) if coordinates is not None else None)
+
+        with self._lock:
+            self._store_in_memory(key, entry)
+            self._save_to_disk(key, entry)
+
+    def clear(self):
+        """Drop every cached entry, including the on-disk tier"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM geocode_cache')
+                self._db.commit()
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'size': len(self._entries),
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'persistent': self._db is not None
+            }
+
+    def _store_in_memory(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _load_from_disk(self, key, now):
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                'SELECT lng, lat, expires_at FROM geocode_cache WHERE key = ?', (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading geocode cache: {str(e)}")
+            return None
+
+        if row is None or row[2] <= now:
+            return None
+        coordinates = (row[0], row[1]) if row[0] is not None else None
+        return (row[2], coordinates)
+
+    def _save_to_disk(self, key, entry):
+        if self._db is None:
+            return
+        expires_at, coordinates = entry
+        lng, lat = coordinates if coordinates is not None else (None, None)
+        try:
+            self._db.execute(
+                'INSERT OR REPLACE INTO geocode_cache (key, lng, lat, expires_at) VALUES (?, ?, ?, ?)',
+                (key, lng, lat, expires_at)
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error writing geocode cache: {str(e)}")
+
+class _BaseGeocodingClient:
+    """Request building, response parsing and caching shared by both clients
+
+    Addresses are looked up in the local gazetteer first, then the cache,
+    and only then sent to Mapbox; Mapbox answers are taught to the gazetteer.
+    """
+
+    def __init__(self, access_token, base_url, cache, gazetteer=None):
+        self.access_token = access_token
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.gazetteer = gazetteer
+
+    def _cached(self, address):
+        if self.gazetteer is not None:
+            coordinates = self.gazetteer.lookup(address)
+            if coordinates is not None:
+                return True, coordinates
+        if self.cache is None:
+            return False, None
+        found, coordinates = self.cache.get(address)
+        return found, (coordinates if coordinates is not None else (None, None))
+
+    def _request(self, address):
+        # URL encode the address
+        encoded_address = requests.utils.quote(address)
+        return f'{self.base_url}/{encoded_address}.json', {
+            'access_token': self.access_token,
+            'limit': 1,
+            'country': 'in'  # Focus on India
+        }
+
+    def _parse(self, address, status_code, text, data):
+        if status_code != 200:
+            logger.error(f"Mapbox API error: {status_code} - {text}")
+            return None, None
+
+        if not data.get('features'):
+            logger.warning(f"No results found for address: {address}")
+            if self.cache is not None:
+                self.cache.set(address, None)
+            return None, None
+
+        # Return [longitude, latitude] as per Mapbox convention
+        feature = data['features'][0]
+        coordinates = (feature['center'][0], feature['center'][1])
+        if self.cache is not None:
+            self.cache.set(address, coordinates)
+        # Only named areas are learned, by Mapbox's canonical name, never street addresses
+        if self.gazetteer is not None and LEARNABLE_PLACE_TYPES.intersection(feature.get('place_type') or ()):
+            self.gazetteer.learn(feature.get('place_name'), coordinates)
+        return coordinates
+
+class GeocodingClient(_BaseGeocodingClient):
+    """Mapbox geocoding client with a pooled keep-alive session
+
+    Requests share one requests.Session with bounded retries and timeouts,
+    and batches of addresses are resolved concurrently on a thread pool.
+    The base URL can point at a local stub server for testing.
+    """
+
+    def __init__(self, access_token, base_url=MAPBOX_GEOCODING_URL, cache=None,
+                 timeout=(3.05, 5), max_retries=2, max_workers=8, pool_size=16, gazetteer=None):
+        super().__init__(access_token, base_url, cache, gazetteer)
+        self.timeout = timeout
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.2,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='geocode')
+
+    def geocode(self, address):
+        """Return (longitude, latitude) for an address, or (None, None)"""
+        found, coordinates = self._cached(address)
+        if found:
+            return coordinates
+
+        return self._fetch(address)
+
+    def geocode_many(self, addresses):
+        """Resolve several addresses concurrently, preserving input order"""
+        results = {}
+        pending = {}
+        for address in addresses:
+            key = normalize_address(address)
+            if key in results or key in pending:
+                continue
+            found, coordinates = self._cached(address)
+            if found:
+                results[key] = coordinates
+                continue
+            pending[key] = self._executor.submit(self._fetch, address)
+
+        for key, future in pending.items():
+            results[key] = future.result()
+
+        return [results[normalize_address(address)] for address in addresses]
+
+    def close(self):
+        """Release pooled connections and worker threads"""
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+    def _fetch(self, address):
+        try:
+            url, params = self._request(address)
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            data = response.json() if response.status_code == 200 else {}
+            return self._parse(address, response.status_code, response.text, data)
+        except Exception as e:
+            logger.error(f"Error geocoding address {address}: {str(e)}")
+            return None, None
+
+class AsyncGeocodingClient(_BaseGeocodingClient):
+    """asyncio counterpart of GeocodingClient built on a shared httpx.AsyncClient"""
+
+    def __init__(self, access_token, base_url=MAPBOX_GEOCODING_URL, cache=None,
+                 timeout=5.0, max_retries=2, max_connections=64, gazetteer=None):
+        import httpx  # Only needed for the async serving mode, so not imported at module level
+        super().__init__(access_token, base_url, cache, gazetteer)
+        self.max_retries = max_retries
+        # Queue excess requests here: httpcore's pool gets slow with many waiters
+        self._slots = asyncio.Semaphore(max_connections)
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=3.05),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=httpx.AsyncHTTPTransport(retries=max_retries)
+        )
+
+    async def geocode(self, address):
+        """Return (longitude, latitude) for an address, or (None, None)"""
+        found, coordinates = self._cached(address)
+        if found:
+            return coordinates
+
+        return await self._fetch(address)
+
+    async def geocode_many(self, addresses):
+        """Resolve several addresses concurrently, preserving input order"""
+        unique = {normalize_address(address): address for address in addresses}
+        results = await asyncio.gather(*(self.geocode(address) for address in unique.values()))
+        resolved = dict(zip(unique, results))
+        return [resolved[normalize_address(address)] for address in addresses]
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _fetch(self, address):
+        try:
+            url, params = self._request(address)
+            for attempt in range(self.max_retries + 1):
+                async with self._slots:
+                    response = await self.client.get(url, params=params)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    break
+                await asyncio.sleep(0.2 * 2 ** attempt)
+            data = response.json() if response.status_code == 200 else {}
+            return self._parse(address, response.status_code, response.text, data)
+        except Exception as e:
+            logger.error(f"Error geocoding address {address}: {str(e)}")
+            return None, None
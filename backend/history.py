@@ -0,0 +1,100 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+# Columns clients may request from the predictions table
+HISTORY_FIELDS = (
+    'id', 'user_id', 'start_point', 'destination', 'day_of_week',
+    'departure_time', 'predicted_time', 'created_at'
+)
+# Always selected so the next page's cursor can be built
+CURSOR_FIELDS = ('created_at', 'id')
+
+def encode_cursor(row):
+    """Opaque cursor pointing just past a row in (created_at, id) order"""
+    payload = json.dumps([row['created_at'], row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor, raising ValueError if malformed
+
+    Both values end up inside a PostgREST filter, so created_at must be an
+    ISO timestamp and id an integer or UUID.
+    """
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        created_at = datetime.fromisoformat(created_at).isoformat()
+        if isinstance(row_id, bool) or not isinstance(row_id, (int, str)):
+            raise ValueError("Invalid cursor id")
+        if isinstance(row_id, str):
+            row_id = str(uuid.UUID(row_id))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return created_at, row_id
+
+def parse_fields(fields):
+    """Validate a comma-separated field list and add the cursor columns"""
+    if not fields:
+        return list(HISTORY_FIELDS)
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in HISTORY_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return requested + [field for field in CURSOR_FIELDS if field not in requested]
+
+def compute_etag(rows, next_cursor):
+    digest = hashlib.sha256(json.dumps([rows, next_cursor], sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:32]
+
+class HistoryCache:
+    """Small per-user cache of history pages, invalidated when a user's predictions change"""
+
+    def __init__(self, max_users=1000, max_pages_per_user=16, ttl=60):
+        self.max_users = max_users
+        self.max_pages_per_user = max_pages_per_user
+        self.ttl = ttl
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, user_id, page_key):
+        """Return the cached (rows, next_cursor, etag) for a page, or None"""
+        with self._lock:
+            pages = self._users.get(user_id)
+            entry = pages.get(page_key) if pages is not None else None
+            if entry is None or entry[0] <= time.time():
+                self._stats['misses'] += 1
+                return None
+            self._users.move_to_end(user_id)
+            self._stats['hits'] += 1
+            return entry[1]
+
+    def set(self, user_id, page_key, page):
+        with self._lock:
+            pages = self._users.setdefault(user_id, OrderedDict())
+            pages[page_key] = (time.time() + self.ttl, page)
+            pages.move_to_end(page_key)
+            while len(pages) > self.max_pages_per_user:
+                pages.popitem(last=False)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._users.pop(user_id, None) is not None:
+                self._stats['invalidations'] += 1
+
+    def invalidate_rows(self, rows):
+        """Invalidate every user that owns one of the given prediction rows"""
+        for user_id in {row.get('user_id') for row in rows}:
+            self.invalidate(user_id)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'users': len(self._users)}
@@ -0,0 +1,248 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+def _worker_main(conn, model_threads):
+    """Worker process loop: load the model once, then answer predict/ping messages"""
+    import numpy as np
+    # Forked workers inherit the parent's RNG state and would draw identical jitter
+    np.random.seed()
+
+    try:
+        from threadpoolctl import threadpool_limits
+        # One BLAS/OpenMP thread per worker so N workers don't oversubscribe N cores
+        threadpool_limits(model_threads)
+    except ImportError:
+        pass
+
+    import model
+    model.load_model()
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+
+        kind, payload = message
+        if kind == 'ping':
+            conn.send(('pong', os.getpid()))
+            continue
+
+        try:
+            conn.send(('ok', model.predict_travel_times(payload)))
+        except Exception as e:
+            try:
+                conn.send(('error', e))
+            except Exception:
+                conn.send(('error', RuntimeError(str(e))))
+
+def _memory_mb(pid):
+    """(resident, shared) memory of a process in MB, or (None, None) without /proc"""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            resident, shared = (int(value) for value in f.read().split()[1:3])
+    except (OSError, ValueError):
+        return None, None
+    page_mb = os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+    return round(resident * page_mb, 1), round(shared * page_mb, 1)
+
+class _Worker:
+    def __init__(self, index, process, conn):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.started_at = time.time()
+        self.requests = 0
+
+class InferencePool:
+    """Scores trips in worker processes that each hold a copy of the model
+
+    With the fork start method the parent loads the model first and workers
+    share its pages copy-on-write. Each worker is driven over its own pipe;
+    callers borrow an idle worker, so at most `processes` batches run at
+    once. Dead or hung workers are replaced, both when a call fails and by
+    a periodic health check that pings idle workers; a batch whose worker
+    died is retried once on the replacement.
+    """
+
+    def __init__(self, processes=None, start_method=None, model_threads=1, timeout=30.0,
+                 health_interval=10.0, min_chunk=128):
+        self.processes = processes or os.cpu_count() or 1
+        if start_method is None:
+            start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.start_method = start_method
+        self.model_threads = model_threads
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self.min_chunk = min_chunk
+        self._context = multiprocessing.get_context(start_method)
+        self._workers = [None] * self.processes
+        self._idle = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.processes, thread_name_prefix='inference-dispatch')
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._stats = {'calls': 0, 'rows': 0, 'errors': 0, 'retries': 0, 'restarts': 0, 'health_checks': 0}
+        self._stats_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            if self.start_method == 'fork':
+                import model
+                model.load_model()  # Loaded once here and inherited by every worker
+            for index in range(self.processes):
+                self._idle.put(self._spawn(index))
+            threading.Thread(target=self._monitor, name='inference-pool-monitor', daemon=True).start()
+            self._started = True
+            logger.info(f"Started {self.processes} inference workers ({self.start_method})")
+
+    def close(self, timeout=5.0):
+        self._stop.set()
+        for worker in self._workers:
+            if worker is None:
+                continue
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self._executor.shutdown(wait=False)
+
+    def predict_travel_times(self, trips):
+        """Drop-in for model.predict_travel_times; large batches are split across workers"""
+        if not trips:
+            return []
+        self.start()
+
+        chunks = min(self.processes, len(trips) // self.min_chunk)
+        if chunks <= 1:
+            return self._call(trips)
+
+        size = -(-len(trips) // chunks)
+        parts = self._executor.map(self._call, [trips[i:i + size] for i in range(0, len(trips), size)])
+        return [prediction for part in parts for prediction in part]
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({
+            'processes': self.processes,
+            'start_method': self.start_method,
+            'idle': self._idle.qsize(),
+            'workers': [self._worker_stats(worker) for worker in self._workers if worker is not None]
+        })
+        return stats
+
+    def _worker_stats(self, worker):
+        rss_mb, shared_mb = _memory_mb(worker.process.pid)
+        return {
+            'pid': worker.process.pid,
+            'alive': worker.process.is_alive(),
+            'requests': worker.requests,
+            'uptime_s': round(time.time() - worker.started_at, 1),
+            'rss_mb': rss_mb,
+            'shared_mb': shared_mb
+        }
+
+    def _spawn(self, index):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.model_threads),
+            name=f'inference-worker-{index}',
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        worker = self._workers[index] = _Worker(index, process, parent_conn)
+        return worker
+
+    def _restart(self, worker, reason):
+        logger.error(f"Restarting inference worker {worker.index} (pid {worker.process.pid}): {reason}")
+        try:
+            worker.conn.close()
+        except OSError:
+            pass
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join(1.0)
+            if worker.process.is_alive():
+                worker.process.kill()
+        worker.process.join(0)
+        self._count('restarts')
+        return self._spawn(worker.index)
+
+    def _request(self, worker, message, timeout):
+        worker.conn.send(message)
+        if not worker.conn.poll(timeout):
+            raise TimeoutError(f"no reply within {timeout}s")
+        return worker.conn.recv()
+
+    def _call(self, trips):
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RuntimeError("No inference worker available")
+
+        try:
+            for attempt in range(2):
+                try:
+                    status, result = self._request(worker, ('predict', trips), self.timeout)
+                    worker.requests += 1
+                    break
+                except (OSError, EOFError, TimeoutError) as e:
+                    self._count('errors')
+                    worker = self._restart(worker, str(e) or type(e).__name__)
+                    # A crashed worker is retried once on its replacement; a hung batch is not
+                    if attempt or isinstance(e, TimeoutError):
+                        raise RuntimeError(f"Inference worker failed: {str(e)}")
+                    self._count('retries')
+        finally:
+            self._idle.put(worker)
+
+        if status == 'error':
+            raise result
+        with self._stats_lock:
+            self._stats['calls'] += 1
+            self._stats['rows'] += len(trips)
+        return result
+
+    def _check(self, worker):
+        """Ping an idle worker, returning it or its replacement"""
+        try:
+            if not worker.process.is_alive():
+                raise EOFError(f"exited with code {worker.process.exitcode}")
+            status, _ = self._request(worker, ('ping', None), self.timeout)
+            if status != 'pong':
+                raise EOFError(f"unexpected reply {status!r}")
+            return worker
+        except (OSError, EOFError, TimeoutError) as e:
+            return self._restart(worker, str(e) or type(e).__name__)
+
+    def _monitor(self):
+        while not self._stop.wait(self.health_interval):
+            self._count('health_checks')
+            # Busy workers are evidently alive; ping the ones that are idle right now
+            for _ in range(self.processes):
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._idle.put(self._check(worker))
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
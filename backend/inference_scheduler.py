@@ -0,0 +1,160 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from metrics import collect_timings, current_timings
+
+logger = logging.getLogger(__name__)
+
+class InferenceScheduler:
+    """Coalesces concurrent single-trip predictions into batched model calls
+
+    Trips submitted from request threads are collected by one background
+    thread for up to max_wait seconds or max_batch_size trips, scored with a
+    single predict_batch call, and each caller's future is resolved with its
+    own prediction. The batch's stage timings (features, model_predict) are
+    added to each caller's request timings before its future resolves, so
+    they show up in Server-Timing. With max_batch_size <= 1 predict()
+    scores inline.
+    Up to `concurrency` batches are scored at once, e.g. one per worker
+    process when predict_batch dispatches to an InferencePool.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=64, max_wait=0.002, max_queue=10000, concurrency=1):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.concurrency = concurrency
+        self._slots = threading.Semaphore(concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='inference-batch') if concurrency > 1 else None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._histogram = {}
+        self._stats = {'submitted': 0, 'batches': 0, 'rows': 0, 'failed_batches': 0}
+        self._stats_lock = threading.Lock()
+
+        # Batch sizes are counted in power-of-two buckets: 1, 2, 3-4, 5-8, ...
+        self._bucket_bounds = [1]
+        while self._bucket_bounds[-1] < max_batch_size:
+            self._bucket_bounds.append(self._bucket_bounds[-1] * 2)
+
+    @property
+    def enabled(self):
+        return self.max_batch_size > 1
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def submit(self, trip):
+        """Queue a trip and return a Future resolving to its prediction"""
+        self.start()
+        future = Future()
+        self._queue.put_nowait((trip, future, current_timings()))
+        with self._stats_lock:
+            self._stats['submitted'] += 1
+        return future
+
+    def predict(self, trip, timeout=None):
+        """Predict one trip, sharing a model call with concurrent callers"""
+        if not self.enabled:
+            prediction = self.predict_batch([trip])[0]
+            self._record(1)
+            return prediction
+        return self.submit(trip).result(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            batches = self._stats['batches']
+            return {
+                **self._stats,
+                'pending': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+                'mean_batch_size': round(self._stats['rows'] / batches, 2) if batches else 0.0,
+                'batch_size_histogram': [
+                    {'max_size': bound, 'batches': self._histogram.get(bound, 0)} for bound in self._bucket_bounds
+                ]
+            }
+
+    def _run(self):
+        while not self._stop.is_set():
+            # While every slot is busy, requests keep queueing and form a larger next batch
+            self._slots.acquire()
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                self._slots.release()
+                continue
+
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Past the deadline, still take whatever is already queued
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if self._executor is None:
+                self._dispatch(batch)
+            else:
+                self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        try:
+            self._score(batch)
+        finally:
+            self._slots.release()
+
+    def _score(self, batch):
+        batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            with collect_timings() as stages:
+                predictions = self.predict_batch([trip for trip, _, _ in batch])
+        except Exception as e:
+            logger.error(f"Batched prediction of {len(batch)} trips failed: {str(e)}")
+            self._record(len(batch), failed=True)
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Score trips one at a time so a single bad trip only fails its own caller
+            for trip, future, timings in batch:
+                try:
+                    with collect_timings() as stages:
+                        prediction = self.predict_batch([trip])[0]
+                    self._resolve(future, timings, stages, prediction)
+                except Exception as trip_error:
+                    future.set_exception(trip_error)
+            return
+
+        self._record(len(batch))
+        for (_, future, timings), prediction in zip(batch, predictions):
+            self._resolve(future, timings, stages, prediction)
+
+    def _resolve(self, future, timings, stages, prediction):
+        # The request thread reads its timings only after the future resolves
+        if timings is not None:
+            timings.extend(stages)
+        future.set_result(prediction)
+
+    def _record(self, size, failed=False):
+        bound = next(bound for bound in self._bucket_bounds if size <= bound)
+        with self._stats_lock:
+            self._stats['batches'] += 1
+            self._stats['rows'] += size
+            if failed:
+                self._stats['failed_batches'] += 1
+            self._histogram[bound] = self._histogram.get(bound, 0) + 1
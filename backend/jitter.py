@@ -0,0 +1,76 @@
+import hashlib
+import os
+
+import numpy as np
+
+from geocoding import normalize_address
+
+# How predictions are jittered:
+#   random - fresh draws on every call (the original behaviour)
+#   seeded - draws derived from (route, departure time bucket), so identical inputs give identical outputs
+#   off    - no jitter at all
+JITTER_MODES = ('random', 'seeded', 'off')
+JITTER_MODE = os.environ.get('JITTER_MODE', 'random').lower()
+JITTER_SEED = int(os.environ.get('JITTER_SEED', 0))
+JITTER_BUCKET_MINUTES = int(os.environ.get('JITTER_BUCKET_MINUTES', 15))
+
+# One uniform [0, 1) draw per trip for each place the pipeline adds noise
+DETOUR, TRAFFIC, SPEED, FEATURE, ADJUSTMENT = range(5)
+N_STREAMS = 5
+# Draws that make each noise term vanish: no detour, and the midpoint of the symmetric ranges
+NEUTRAL = np.array([0.0, 0.5, 0.5, 0.5, 0.5])
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+def parse_jitter_mode(value):
+    """Validate a per-request jitter mode; None means use JITTER_MODE"""
+    if value is None:
+        return None
+    mode = str(value).lower()
+    if mode not in JITTER_MODES:
+        raise ValueError(f"Invalid jitter mode {value!r} (expected one of {', '.join(JITTER_MODES)})")
+    return mode
+
+def _splitmix64(x):
+    """SplitMix64 finalizer over a uint64 array"""
+    with np.errstate(over='ignore'):
+        x = x + _GOLDEN
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+def trip_key(trip):
+    """Stable 64-bit key for a trip's route and departure time bucket"""
+    hour, minute = (int(part) for part in trip['departure_time'].split(':')[:2])
+    bucket = (hour * 60 + minute) // JITTER_BUCKET_MINUTES
+    key = '|'.join([
+        normalize_address(trip['start_point']),
+        normalize_address(trip['destination']),
+        str(trip.get('route_type') or ''),
+        str(trip['day_of_week']).lower(),
+        str(bucket)
+    ])
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+
+def seeded_draws(keys, seed=JITTER_SEED):
+    """len(keys) x N_STREAMS uniform draws, a pure function of each key and the seed"""
+    keys = np.asarray(keys, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        base = _splitmix64(keys ^ np.uint64(seed & 0xFFFFFFFFFFFFFFFF))
+        streams = base[:, None] + np.arange(1, N_STREAMS + 1, dtype=np.uint64) * _GOLDEN
+    # Top 53 bits as a double in [0, 1)
+    return (_splitmix64(streams) >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+def jitter_draws(trips, default_mode=None):
+    """Noise draws for a batch of trips, honouring each trip's optional 'jitter' mode"""
+    default_mode = default_mode or JITTER_MODE
+    modes = np.array([trip.get('jitter') or default_mode for trip in trips], dtype=object)
+
+    draws = np.random.random((len(trips), N_STREAMS))
+    off = modes == 'off'
+    if off.any():
+        draws[off] = NEUTRAL
+    seeded = np.flatnonzero(modes == 'seeded')
+    if len(seeded):
+        draws[seeded] = seeded_draws([trip_key(trips[i]) for i in seeded])
+    return draws
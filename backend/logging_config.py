@@ -0,0 +1,151 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+# '{pid}' in the name is replaced by the process id. Rotation isn't safe across
+# processes, so with uvicorn --workers use a '{pid}' name or LOG_FILE='' (stderr
+# only); forked children (the inference pool) switch to their own file anyway.
+LOG_FILE = os.environ.get('LOG_FILE', 'model_predictions.log')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()  # 'json' or 'text'
+LOG_CONSOLE_LEVEL = os.environ.get('LOG_CONSOLE_LEVEL', 'WARNING').upper()
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+# Fraction of per-stage detail lines kept when DEBUG logging is on
+LOG_DETAIL_SAMPLE_RATE = float(os.environ.get('LOG_DETAIL_SAMPLE_RATE', 1.0))
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the message and any `extra=` fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread unformatted and drops them if the queue is full"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread, not the request thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _NonBlockingQueueHandler.dropped += 1
+
+_lock = threading.Lock()
+_handler = None
+_listener = None
+
+def _log_path(forked=False):
+    """This process's log file; a forked child gets its own name even without '{pid}'"""
+    pid = str(os.getpid())
+    if '{pid}' in LOG_FILE:
+        return LOG_FILE.replace('{pid}', pid)
+    if forked:
+        root, ext = os.path.splitext(LOG_FILE)
+        return f'{root}.{pid}{ext}'
+    return LOG_FILE
+
+def _file_handler(path, formatter):
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8', delay=True
+    )
+    file_handler.setFormatter(formatter)
+    return file_handler
+
+def _build_handlers():
+    formatter = JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers = []
+    if LOG_FILE:
+        handlers.append(_file_handler(_log_path(), formatter))
+
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setLevel(LOG_CONSOLE_LEVEL)
+    console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handlers.append(console_handler)
+    return handlers
+
+def _start_listener(handlers):
+    global _listener
+    _handler.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _listener = logging.handlers.QueueListener(_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+def configure_logging():
+    """Route all logging through a bounded queue to a rotating file on a background thread
+
+    Safe to call from every module; only the first call installs the handlers.
+    """
+    global _handler
+    with _lock:
+        if _handler is not None:
+            return
+        _handler = _NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+        _start_listener(_build_handlers())
+
+        root = logging.getLogger()
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(_handler)
+        atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+def _after_fork():
+    # The listener thread doesn't survive fork; give the child its own, and
+    # its own log file so parent and child never rotate the same one
+    if _listener is None:
+        return
+    handlers = []
+    for handler in _listener.handlers:
+        if isinstance(handler, logging.handlers.RotatingFileHandler):
+            handler.close()
+            handler = _file_handler(_log_path(forked=True), handler.formatter)
+        handlers.append(handler)
+    _start_listener(handlers)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+def detail_enabled(logger):
+    """Whether to emit a per-stage detail line: DEBUG only, sampled at LOG_DETAIL_SAMPLE_RATE"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return False
+    return LOG_DETAIL_SAMPLE_RATE >= 1.0 or random.random() < LOG_DETAIL_SAMPLE_RATE
+
+def stats():
+    return {
+        'pending': _handler.queue.qsize() if _handler is not None else 0,
+        'dropped': _NonBlockingQueueHandler.dropped
+    }
@@ -1,205 +1,429 @@
-import joblib
-import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
 import logging
-from utils import calculate_distance, calculate_average_speed, calculate_road_complexity
+from utils import route_distances, is_coordinate
+from feature_table import traffic_multipliers, average_speeds, weekend_flags
+from compiled_model import CompiledEnsemble, export_pipeline, verify_compiled
+from metrics import timed, record_stage
+from logging_config import configure_logging, detail_enabled
+from jitter import jitter_draws, DETOUR, TRAFFIC, SPEED, FEATURE, ADJUSTMENT, NEUTRAL
 import time
+import hashlib
+import threading
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='model_predictions.log'
-)
+# Log through the shared non-blocking, rotating pipeline
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Cache for model and its timestamp
-_model_cache = {
-    'model': None,
-    'last_loaded': 0,
-    'refresh_interval': 300  # Refresh model every 5 minutes
-}
+# Serve the array-backed compiled ensemble instead of the sklearn pipeline
+USE_COMPILED_MODEL = os.environ.get('USE_COMPILED_MODEL', 'false').lower() in ('1', 'true', 'yes')
+COMPILED_MODEL_RTOL = float(os.environ.get('COMPILED_MODEL_RTOL', 1e-4))
+COMPILED_MODEL_ATOL = float(os.environ.get('COMPILED_MODEL_ATOL', 1e-3))
 
-def load_model(force_refresh=False):
-    """Load the trained model with caching and periodic refresh"""
+MODEL_PATH = os.path.join('models', 'best_model.pkl')
+# Verified export written by `python compiled_model.py`; loaded instead of the pickle when it matches
+COMPILED_SUFFIX = '.compiled.npz'
+MODEL_CHECK_INTERVAL = int(os.environ.get('MODEL_CHECK_INTERVAL', 300))  # Check for a new model every 5 minutes
+
+def _verification_columns():
+    """Synthetic feature columns covering every day, hour and distance band"""
+    days = np.array(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'], dtype=object)
+    distances = np.array([2.5, 7.5, 12.5, 25.0])
+    
+    day_names = np.repeat(days, 24 * len(distances))
+    hours = np.tile(np.repeat(np.arange(24), len(distances)), len(days))
+    distances = np.tile(distances, 24 * len(days))
+    traffic_multipliers = np.linspace(0.8, 3.0, len(hours))
+    avg_speeds = np.linspace(10, 60, len(hours))
+    
+    return _feature_columns(hours, day_names, traffic_multipliers, distances, avg_speeds,
+                            noise=np.full(len(hours), 0.5))
+
+def _verification_frame():
+    import pandas as pd
+    return pd.DataFrame(_verification_columns())
+
+def _compile_model(pipeline):
+    """Export the pipeline to a CompiledEnsemble, falling back to the pipeline if it does not match"""
+    try:
+        compiled = export_pipeline(pipeline)
+        max_error = verify_compiled(pipeline, compiled, _verification_frame(),
+                                    rtol=COMPILED_MODEL_RTOL, atol=COMPILED_MODEL_ATOL)
+        logger.info(f"Compiled model verified (max abs error {max_error:.6f})")
+        return compiled, True
+    except Exception as e:
+        logger.warning(f"Using sklearn pipeline, compiled model unavailable: {str(e)}")
+        return pipeline, False
+
+def _compiled_path(model_path):
+    return os.path.splitext(model_path)[0] + COMPILED_SUFFIX
+
+def _load_compiled_export(model_path, sha256):
+    """The verified export of this exact pickle, or None if there isn't a usable one"""
+    path = _compiled_path(model_path)
+    if not os.path.exists(path):
+        return None
     try:
-        current_time = time.time()
+        compiled = CompiledEnsemble.load(path)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable compiled model {path}: {str(e)}")
+        return None
+    if compiled.source_sha256 != sha256:
+        logger.info(f"Ignoring compiled model {path}, it was exported from a different pickle")
+        return None
+    return compiled
+
+def export_compiled_model(model_path=MODEL_PATH, output_path=None):
+    """Export the pickled pipeline, verify it and save it where the reloader looks for it"""
+    import joblib
+    pipeline = joblib.load(model_path)
+    compiled = export_pipeline(pipeline)
+    max_error = verify_compiled(pipeline, compiled, _verification_frame(),
+                                rtol=COMPILED_MODEL_RTOL, atol=COMPILED_MODEL_ATOL)
+    compiled.source_sha256 = _file_sha256(model_path)
+    output_path = output_path or _compiled_path(model_path)
+    compiled.save(output_path)
+    return compiled, output_path, max_error
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ModelReloader:
+    """Keeps the current model and reloads it in the background when the file changes
+    
+    New models are loaded and warmed up off the request path, then swapped in
+    with a single assignment. If a load fails the previous model keeps serving.
+    """
+    
+    def __init__(self, path=MODEL_PATH, check_interval=MODEL_CHECK_INTERVAL, compiled=USE_COMPILED_MODEL):
+        self.path = path
+        self.check_interval = check_interval
+        self.compiled = compiled
+        self._current = None  # (model, version) swapped atomically
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_error = None
+    
+    def get(self):
+        """Return the current model, loading it synchronously only on first use"""
+        current = self._current
+        if current is None:
+            with self._load_lock:
+                if self._current is None:
+                    self._load(raise_errors=True)
+            current = self._current
+        self.start()
+        return current[0]
+    
+    def version(self):
+        current = self._current
+        version = dict(current[1]) if current is not None else {'loaded': False}
+        version['last_error'] = self._last_error
+        return version
+    
+    def check(self):
+        """Reload the model if the file's mtime and content hash changed"""
+        current = self._current
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            self._last_error = str(e)
+            logger.error(f"Error checking model file: {str(e)}")
+            return False
         
-        # Check if model needs refresh
-        if (_model_cache['model'] is None or 
-            force_refresh or 
-            current_time - _model_cache['last_loaded'] > _model_cache['refresh_interval']):
-            
-            model_path = os.path.join('models', 'best_model.pkl')
-            _model_cache['model'] = joblib.load(model_path)
-            _model_cache['last_loaded'] = current_time
-            logger.info("Model refreshed successfully")
+        if current is not None:
+            version = current[1]
+            if (stat.st_mtime, stat.st_size) == (version['mtime'], version['size']):
+                return False
+            if _file_sha256(self.path) == version['sha256']:
+                self._current = (current[0], {**version, 'mtime': stat.st_mtime, 'size': stat.st_size})
+                return False
         
-        return _model_cache['model']
-    except Exception as e:
-        logger.error(f"Error loading model: {str(e)}")
-        raise
+        with self._load_lock:
+            return self._load()
+    
+    def reload(self, compiled=None):
+        """Load the model now, optionally switching between compiled and pipeline mode"""
+        with self._load_lock:
+            if compiled is not None:
+                self.compiled = compiled
+            return self._load(raise_errors=self._current is None)
+    
+    def start(self):
+        if self._thread is not None or self.check_interval <= 0:
+            return
+        with self._load_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='model-reloader', daemon=True)
+                self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def _after_fork(self):
+        # Threads and held locks don't survive fork; the loaded model does
+        self._load_lock = threading.Lock()
+        self._thread = None
+    
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error in model reloader: {str(e)}")
+    
+    def _load(self, raise_errors=False):
+        try:
+            start_time = time.time()
+            stat = os.stat(self.path)
+            sha256 = _file_sha256(self.path)
+            
+            model = _load_compiled_export(self.path, sha256) if self.compiled else None
+            is_compiled = model is not None
+            if model is None:
+                import joblib  # Loading the model pulls in sklearn, xgboost and lightgbm anyway
+                model = joblib.load(self.path)
+                if self.compiled:
+                    model, is_compiled = _compile_model(model)
+            
+            # Warm up so the first request doesn't pay for lazy initialisation
+            warmup = {column: values[:8] for column, values in _verification_columns().items()}
+            model.predict(_model_input(model, warmup))
+            
+            self._current = (model, {
+                'loaded': True,
+                'sha256': sha256,
+                'version': sha256[:12],
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'compiled': is_compiled,
+                'loaded_at': datetime.now().isoformat(),
+                'load_seconds': round(time.time() - start_time, 3)
+            })
+            self._last_error = None
+            logger.info(f"Model {sha256[:12]} loaded successfully")
+            return True
+        except Exception as e:
+            self._last_error = str(e)
+            logger.error(f"Error loading model: {str(e)}")
+            if raise_errors:
+                raise
+            return False
+
+_reloader = ModelReloader()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reloader._after_fork)
+
+def load_model(force_refresh=False, compiled=None):
+    """Return the current model, loaded and refreshed by a background reloader
+    
+    With compiled=True (or USE_COMPILED_MODEL set) the pipeline is exported to
+    an array-backed evaluator and checked against the original before use,
+    or a verified export of the same pickle is loaded without sklearn.
+    """
+    if force_refresh or (compiled is not None and compiled != _reloader.compiled):
+        _reloader.reload(compiled=compiled)
+    return _reloader.get()
+
+def get_model_version():
+    """Describe the model currently serving predictions"""
+    return _reloader.version()
 
 def get_traffic_multiplier(hour_of_day, day_of_week, route_type, distance_km):
     """Calculate traffic multiplier with improved distance-based factors"""
     try:
-        # Base multiplier
-        traffic_multiplier = 1.0
-        
-        # Distance-based base multiplier
-        if distance_km < 5:
-            traffic_multiplier *= 1.3  # Short routes have more stops/turns
-        elif distance_km < 10:
-            traffic_multiplier *= 1.2
-        elif distance_km < 15:
-            traffic_multiplier *= 1.1
-        else:
-            traffic_multiplier *= 1.0  # Long routes often use highways
-        
-        # Peak hours with distance consideration
-        morning_peak = (hour_of_day >= 7 and hour_of_day <= 10)
-        evening_peak = (hour_of_day >= 17 and hour_of_day <= 20)
-        is_peak_hour = morning_peak or evening_peak
-        
-        # Weekend adjustment
-        is_weekend = day_of_week.lower() in ['saturday', 'sunday']
-        
-        # Route type specific adjustments
-        route_multipliers = {
-            'IT Hub': 1.3,
-            'Commercial': 1.2,
-            'Mixed': 1.25,
-            'Residential': 1.1
-        }
-        route_multiplier = route_multipliers.get(route_type, 1.2)
-        
-        # Apply multipliers based on conditions
-        if is_peak_hour:
-            if is_weekend:
-                if distance_km < 10:
-                    traffic_multiplier += 0.4  # Short routes more affected
-                else:
-                    traffic_multiplier += 0.3
-            else:
-                if distance_km < 10:
-                    traffic_multiplier += 0.9  # Short routes heavily affected during weekday peaks
-                else:
-                    traffic_multiplier += 0.7
-        elif hour_of_day <= 5 or hour_of_day >= 22:  # Night hours
-            traffic_multiplier -= 0.4
-        elif is_weekend:
-            if distance_km < 10:
-                traffic_multiplier += 0.3
-            else:
-                traffic_multiplier += 0.2
+        traffic_multiplier = float(traffic_multipliers(
+            [hour_of_day], weekend_flags([day_of_week]), [route_type], [distance_km]
+        )[0])
         
-        # Apply route type multiplier
-        traffic_multiplier *= route_multiplier
-        
-        # Add real-time variation
-        time_of_day_factor = 1.0
-        if morning_peak:
-            time_of_day_factor = 1.2
-        elif evening_peak:
-            time_of_day_factor = 1.3
-        
-        traffic_multiplier *= time_of_day_factor
-        
-        # Add small random variation for real-time conditions
-        random_factor = 1 + (np.random.random() * 0.2 - 0.1)
-        traffic_multiplier *= random_factor
-        
-        logger.info(f"Traffic multiplier: {traffic_multiplier:.2f} for {route_type} route ({distance_km} km)")
+        if detail_enabled(logger):
+            logger.debug("Traffic multiplier: %.2f for %s route (%s km)", traffic_multiplier, route_type, distance_km,
+                         extra={'traffic_multiplier': traffic_multiplier, 'route_type': route_type})
         return traffic_multiplier
     except Exception as e:
         logger.error(f"Error calculating traffic multiplier: {str(e)}")
         return 1.0
 
-def predict_travel_time(start_point, destination, day_of_week, departure_time, route_type=None):
-    """Make prediction using the trained model with improved accuracy"""
+def _feature_columns(hours, day_names, traffic_multipliers, distances, avg_speeds, now=None, noise=None):
+    """Build the model feature columns for a batch of trips using column operations"""
+    now = now or datetime.now()
+    n = len(hours)
+    noise = np.random.random(n) if noise is None else noise
+    
+    is_weekend = weekend_flags(day_names).astype(int)
+    is_peak_hour = (((hours >= 7) & (hours <= 10)) | ((hours >= 17) & (hours <= 20))).astype(int)
+    
+    features = {
+        'day_of_week': day_names,
+        'month': np.full(n, now.strftime('%B'), dtype=object),
+        'hour_of_day': hours,
+        'is_weekend': is_weekend,
+        'is_peak_hour': is_peak_hour,
+        'traffic_multiplier': traffic_multipliers,
+        'distance_km': distances,
+        'base_speed': avg_speeds,
+        'noise_multiplier': 1.0 + (noise * 0.1 - 0.05),
+        'is_morning': ((hours >= 6) & (hours <= 12)).astype(int),
+        'is_evening': ((hours >= 16) & (hours <= 20)).astype(int),
+        'is_night': ((hours <= 5) | (hours >= 22)).astype(int),
+        'traffic_distance': distances * traffic_multipliers,
+        'speed_kmh': avg_speeds,
+        'traffic_speed': avg_speeds / traffic_multipliers,
+        'weekend_traffic': is_weekend * traffic_multipliers,
+        'peak_traffic': is_peak_hour * traffic_multipliers,
+        'quarter': np.full(n, f'Q{(now.month-1)//3 + 1}', dtype=object),
+        'week_of_year': np.full(n, now.isocalendar()[1])
+    }
+    
+    return features
+
+def _model_input(model, columns):
+    """Raw float matrix for the compiled model, a DataFrame for the sklearn pipeline"""
+    if isinstance(model, CompiledEnsemble):
+        return model.encoder.encode_columns(columns)
+    import pandas as pd  # Deferred so importing this module stays cheap
+    return pd.DataFrame(columns)
+
+def _adjust_predictions(base_predictions, distances, noise=None, rounded=True):
+    """Apply variability, realistic bounds and intersection delays to raw model output"""
+    # Short trips have more variability, longer trips tend to be more predictable
+    variability = np.select([distances < 5, distances < 10], [0.20, 0.15], default=0.10)
+    
+    # Add real-time variability
+    noise = np.random.random(len(distances)) if noise is None else noise
+    random_adjustment = 1 + (noise * variability * 2 - variability)
+    predictions = base_predictions * random_adjustment
+    
+    # Calculate realistic bounds based on distance and conditions
+    min_speed = np.select([distances < 5, distances < 15], [8, 12], default=15)  # km/h
+    max_speed = np.select([distances < 5, distances < 15], [35, 45], default=55)  # km/h
+    
+    min_time = (distances / max_speed) * 60  # minutes
+    max_time = (distances / min_speed) * 60  # minutes
+    
+    # Ensure predictions are within realistic bounds
+    predictions = np.maximum(min_time, np.minimum(predictions, max_time))
+    
+    # Add traffic light and intersection delays (one intersection every 500m, 0.5 min each)
+    num_intersections = np.maximum(1, (distances / 0.5).astype(int))
+    predictions = predictions + num_intersections * 0.5
+    
+    # Round to nearest minute
+    return np.round(predictions).astype(int) if rounded else predictions
+
+def predict_travel_times(trips):
+    """Predict travel times for a batch of trips with a single model call
+    
+    Each trip is a dict with start_point, destination, day_of_week,
+    departure_time and optional route_type, start_coords and dest_coords
+    ((lat, lon) pairs used for the distance), jitter ('random', 'seeded'
+    or 'off', defaulting to JITTER_MODE) and speed_at_departure (use the
+    departure hour rather than the current one for the speed adjustment).
+    Peak-hour detours always follow the departure hour.
+    """
     try:
+        if not trips:
+            return []
+        
         # Load model (with potential refresh)
         model = load_model()
         
-        # Parse departure time
-        hour_of_day = int(departure_time.split(':')[0])
-        
-        # Calculate distance with area type consideration
-        distance = calculate_distance(start_point, destination, route_type)
-        
-        # Get traffic multiplier with distance consideration
-        traffic_multiplier = get_traffic_multiplier(hour_of_day, day_of_week, route_type, distance)
-        
-        # Calculate average speed with distance consideration
-        avg_speed = calculate_average_speed(traffic_multiplier, route_type, distance)
+        features_started = time.perf_counter()
+        route_types = [trip.get('route_type') for trip in trips]
+        day_names = np.array([trip['day_of_week'] for trip in trips], dtype=object)
+        hours = np.array([int(trip['departure_time'].split(':')[0]) for trip in trips])
+        noise = jitter_draws(trips)
         
-        # Create feature dictionary with improved features
-        features = {
-            'day_of_week': [day_of_week],
-            'month': [datetime.now().strftime('%B')],
-            'hour_of_day': [hour_of_day],
-            'is_weekend': [int(day_of_week.lower() in ['saturday', 'sunday'])],
-            'is_peak_hour': [int((hour_of_day >= 7 and hour_of_day <= 10) or (hour_of_day >= 17 and hour_of_day <= 20))],
-            'traffic_multiplier': [traffic_multiplier],
-            'distance_km': [distance],
-            'base_speed': [avg_speed],
-            'noise_multiplier': [1.0 + (np.random.random() * 0.1 - 0.05)],
-            'is_morning': [int(hour_of_day >= 6 and hour_of_day <= 12)],
-            'is_evening': [int(hour_of_day >= 16 and hour_of_day <= 20)],
-            'is_night': [int(hour_of_day <= 5 or hour_of_day >= 22)],
-            'traffic_distance': [distance * traffic_multiplier],
-            'speed_kmh': [avg_speed],
-            'traffic_speed': [avg_speed / traffic_multiplier],
-            'weekend_traffic': [int(day_of_week.lower() in ['saturday', 'sunday']) * traffic_multiplier],
-            'peak_traffic': [int((hour_of_day >= 7 and hour_of_day <= 10) or (hour_of_day >= 17 and hour_of_day <= 20)) * traffic_multiplier],
-            'quarter': [f'Q{(datetime.now().month-1)//3 + 1}'],
-            'week_of_year': [datetime.now().isocalendar()[1]]
-        }
+        # Calculate distances with area type consideration from (lat, lon) coordinates
+        starts = [trip.get('start_coords') or trip['start_point'] for trip in trips]
+        ends = [trip.get('dest_coords') or trip['destination'] for trip in trips]
+        located = np.array([is_coordinate(start) and is_coordinate(end) for start, end in zip(starts, ends)])
         
-        # Convert to DataFrame
-        df = pd.DataFrame(features)
+        distances = np.full(len(trips), 10.0)  # Fallback distance when coordinates are unknown
+        if located.any():
+            distances[located] = route_distances(
+                [start for start, ok in zip(starts, located) if ok],
+                [end for end, ok in zip(ends, located) if ok],
+                [route_type for route_type, ok in zip(route_types, located) if ok],
+                noise=noise[located, DETOUR],
+                hours=hours[located]  # Peak-hour detours follow each trip's departure time
+            )
+        if not located.all():
+            logger.warning("Using fallback distance for %d trips without coordinates", int((~located).sum()))
         
-        # Make prediction
-        base_prediction = model.predict(df)[0]
+        # Traffic multipliers and average speeds from the precomputed feature table
+        multipliers = traffic_multipliers(hours, weekend_flags(day_names), route_types, distances, noise[:, TRAFFIC])
+        speed_hours = np.where([bool(trip.get('speed_at_departure')) for trip in trips], hours, datetime.now().hour)
+        avg_speeds = average_speeds(multipliers, route_types, distances, speed_hours, noise[:, SPEED])
         
-        # Distance-based prediction adjustments
-        if distance < 5:
-            # Short trips have more variability
-            variability = 0.20
-        elif distance < 10:
-            variability = 0.15
-        else:
-            # Longer trips tend to be more predictable
-            variability = 0.10
-            
-        # Add real-time variability
-        random_adjustment = 1 + (np.random.random() * variability * 2 - variability)
-        prediction = base_prediction * random_adjustment
-        
-        # Calculate realistic bounds based on distance and conditions
-        min_speed = 8 if distance < 5 else (12 if distance < 15 else 15)  # km/h
-        max_speed = 35 if distance < 5 else (45 if distance < 15 else 55)  # km/h
-        
-        min_time = (distance / max_speed) * 60  # minutes
-        max_time = (distance / min_speed) * 60  # minutes
+        features = _model_input(model, _feature_columns(hours, day_names, multipliers, distances, avg_speeds,
+                                                        noise=noise[:, FEATURE]))
+        record_stage('features', time.perf_counter() - features_started)
         
-        # Ensure prediction is within realistic bounds
-        prediction = max(min_time, min(prediction, max_time))
+        # Score every trip in one call
+        with timed('model_predict'):
+            base_predictions = np.asarray(model.predict(features), dtype=float)
+        predictions = _adjust_predictions(base_predictions, distances, noise[:, ADJUSTMENT])
         
-        # Add traffic light and intersection delays
-        num_intersections = max(1, int(distance / 0.5))  # Estimate one intersection every 500m
-        intersection_delay = 0.5  # minutes per intersection
-        total_intersection_delay = num_intersections * intersection_delay
-        
-        prediction += total_intersection_delay
-        
-        # Round to nearest minute
-        prediction = round(prediction)
+        if detail_enabled(logger):
+            logger.debug("Batch prediction completed for %d trips", len(trips), extra={'trips': len(trips)})
+        return predictions.tolist()
+    except Exception as e:
+        logger.error(f"Error making batch prediction: {str(e)}")
+        raise
+
+def predict_distance_profiles(day_names, hours, distances, route_type=None, rounded=True):
+    """Travel times at each road distance for every (day, hour) bucket, without jitter
+    
+    route_type is a single route/area type or one per distance. Returns a
+    len(hours) x len(distances) array of minutes from one model call,
+    rounded to whole minutes unless rounded=False.
+    """
+    model = load_model()
+    distances = np.asarray(distances, dtype=float)
+    
+    n = len(hours) * len(distances)
+    bucket_hours = np.repeat(np.asarray(hours, dtype=int), len(distances))
+    bucket_days = np.repeat(np.asarray(day_names, dtype=object), len(distances))
+    bucket_distances = np.tile(distances, len(hours))
+    route_types = np.tile(np.broadcast_to(np.asarray(route_type, dtype=object), distances.shape), len(hours))
+    noise = np.broadcast_to(NEUTRAL, (n, len(NEUTRAL)))
+    
+    # Speeds use each bucket's own hour rather than the current one
+    multipliers = traffic_multipliers(bucket_hours, weekend_flags(bucket_days), route_types, bucket_distances, noise[:, TRAFFIC])
+    avg_speeds = average_speeds(multipliers, route_types, bucket_distances, bucket_hours, noise[:, SPEED])
+    features = _model_input(model, _feature_columns(bucket_hours, bucket_days, multipliers, bucket_distances,
+                                                    avg_speeds, noise=noise[:, FEATURE]))
+    
+    with timed('model_predict'):
+        base_predictions = np.asarray(model.predict(features), dtype=float)
+    predictions = _adjust_predictions(base_predictions, bucket_distances, noise[:, ADJUSTMENT], rounded)
+    return predictions.reshape(len(hours), len(distances))
+
+def predict_travel_time(start_point, destination, day_of_week, departure_time, route_type=None,
+                        start_coords=None, dest_coords=None, jitter=None):
+    """Make prediction using the trained model with improved accuracy"""
+    try:
+        prediction = predict_travel_times([{
+            'start_point': start_point,
+            'destination': destination,
+            'day_of_week': day_of_week,
+            'departure_time': departure_time,
+            'route_type': route_type,
+            'start_coords': start_coords,
+            'dest_coords': dest_coords,
+            'jitter': jitter
+        }])[0]
         
-        logger.info(f"Final prediction: {prediction} minutes for {distance:.1f} km journey")
+        if detail_enabled(logger):
+            logger.debug("Final prediction: %s minutes", prediction, extra={'predicted_time': prediction})
         return prediction
     except Exception as e:
         logger.error(f"Error making prediction: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
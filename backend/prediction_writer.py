@@ -0,0 +1,143 @@
+import logging
+import queue
+import threading
+import time
+
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class PredictionWriter:
+    """Write-behind queue that stores prediction history in bulk inserts
+
+    Rows are queued by request handlers and written by a background thread
+    with a client borrowed from borrow_client(), flushing when batch_size rows are pending
+    or flush_interval seconds have passed. The queue is bounded: when it is
+    full submit() waits up to enqueue_timeout and then drops the row.
+    """
+
+    def __init__(self, borrow_client, table='predictions', batch_size=100, flush_interval=1.0,
+                 max_queue=10000, enqueue_timeout=0.05, max_retries=2, on_flush=None):
+        self.borrow_client = borrow_client
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self.on_flush = on_flush
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._closed = False
+        self._stats = {'submitted': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+        self._stats_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='prediction-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, row):
+        """Queue a row for insertion; returns False if it was dropped"""
+        if self._closed:
+            self._count('dropped')
+            return False
+
+        self.start()
+        try:
+            self._queue.put(row, block=self.enqueue_timeout > 0, timeout=self.enqueue_timeout or None)
+        except queue.Full:
+            self._count('dropped')
+            logger.warning("Prediction queue full, dropping history row")
+            return False
+
+        self._count('submitted')
+        return True
+
+    def flush(self):
+        """Ask the writer thread to write pending rows without waiting for the interval"""
+        self._flush_requested.set()
+
+    def close(self, timeout=10.0):
+        """Stop accepting rows and drain the queue"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.error("Prediction queue full during shutdown")
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            return {**self._stats, 'pending': self._queue.qsize()}
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = None
+            while len(batch) < self.batch_size:
+                timeout = self.flush_interval if deadline is None else deadline - time.monotonic()
+                if batch and (timeout <= 0 or self._flush_requested.is_set()):
+                    break
+                try:
+                    item = self._queue.get(timeout=max(timeout, 0.01))
+                except queue.Empty:
+                    if batch:
+                        break
+                    continue
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            self._flush_requested.clear()
+            if batch:
+                self._write(batch)
+
+        # Drain anything queued after the stop marker
+        remaining = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.batch_size):
+            self._write(remaining[start:start + self.batch_size])
+
+    def _write(self, rows):
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.borrow_client() as client, timed('db_insert'):
+                    client.table(self.table).insert(rows).execute()
+                self._count('written', len(rows))
+                self._count('batches')
+                break
+            except Exception as e:
+                logger.error(f"Error writing {len(rows)} predictions (attempt {attempt + 1}): {str(e)}")
+                time.sleep(min(0.1 * 2 ** attempt, 2.0))
+        else:
+            self._count('failed', len(rows))
+            return
+
+        if self.on_flush is not None:
+            try:
+                self.on_flush(rows)
+            except Exception as e:
+                logger.error(f"Error in prediction flush callback: {str(e)}")
@@ -0,0 +1,160 @@
+import csv
+import logging
+import os
+
+import numpy as np
+
+from gazetteer import GAZETTEER_PATH
+from model import predict_distance_profiles
+from utils import path_distances, route_distances, straight_distance_matrix
+
+logger = logging.getLogger(__name__)
+
+# Off-peak hour whose predictions stand in for "typical" traffic on the same day
+TRAFFIC_TYPICAL_HOUR = int(os.environ.get('TRAFFIC_TYPICAL_HOUR', 14))
+POLYLINE_PRECISION = 5
+# Segments shorter than this are treated as this long so speeds stay finite
+MIN_SEGMENT_KM = 0.01
+# A segment takes the area type of the nearest place in the gazetteer within this distance
+AREA_TYPE_RADIUS_KM = float(os.environ.get('AREA_TYPE_RADIUS_KM', 2.5))
+
+def encode_polyline(points, precision=POLYLINE_PRECISION):
+    """Encode (lat, lng) points with the Google encoded polyline algorithm"""
+    values = np.round(np.asarray(points, dtype=float).reshape(-1, 2) * 10 ** precision).astype(np.int64)
+    deltas = np.diff(values, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    chars = []
+    for value in deltas.tolist():
+        value = ~(value << 1) if value < 0 else value << 1
+        while value >= 0x20:
+            chars.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chars.append(chr(value + 63))
+    return ''.join(chars)
+
+def decode_polyline(encoded, precision=POLYLINE_PRECISION):
+    """(lat, lng) points of an encoded polyline, raising ValueError if it is malformed"""
+    values, value, shift = [], 0, 0
+    for char in encoded:
+        byte = ord(char) - 63
+        if not 0 <= byte < 64:
+            raise ValueError("Invalid polyline")
+        value |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    if shift or not values or len(values) % 2:
+        raise ValueError("Invalid polyline")
+    return np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+
+def split_path(points, segments):
+    """Split a (lat, lng) path at its own vertices into up to `segments` runs of similar length
+
+    Returns (boundaries, lengths): the index of the vertex where each
+    segment starts followed by the last vertex, and each segment's length
+    along the path in km. Paths with few vertices get fewer segments.
+    """
+    points = np.asarray(points, dtype=float)
+    cumulative = np.concatenate([[0.0], np.cumsum(path_distances(points))])
+    targets = np.linspace(0.0, cumulative[-1], segments + 1)
+    # Cut at whichever vertex is nearest each equal-length target
+    after = np.searchsorted(cumulative, targets).clip(1, len(points) - 1)
+    nearest = np.where(targets - cumulative[after - 1] < cumulative[after] - targets, after - 1, after)
+    boundaries = np.unique(np.concatenate([[0], nearest, [len(points) - 1]]))
+    return boundaries, np.diff(cumulative[boundaries])
+
+def interpolate_route(start, end, segments):
+    """A straight path of segments + 1 points between two (lat, lng) points
+
+    Returns (points, boundaries, lengths) with boundaries and lengths as
+    from split_path.
+    """
+    points = np.linspace(np.asarray(start, dtype=float), np.asarray(end, dtype=float), segments + 1)
+    lengths = np.full(segments, float(path_distances([start, end])[0]) / segments)
+    return points, np.arange(segments + 1), lengths
+
+def road_lengths(points, lengths):
+    """Segment lengths in road km, scaled up to at least the road distance /predict would use
+
+    A straight line or sparse polyline is shorter than the road it stands
+    for, so it is stretched to that estimate; a detailed route polyline
+    already follows the road and is left as it is.
+    """
+    lengths = np.asarray(lengths, dtype=float)
+    road_km = float(route_distances([points[0]], [points[-1]], noise=[0.0])[0])
+    total = lengths.sum()
+    scale = max(road_km / total, 1.0) if total > 0 else 1.0
+    return np.maximum(lengths * scale, MIN_SEGMENT_KM)
+
+class AreaTypes:
+    """Area type of the nearest known place within radius_km of a point"""
+
+    def __init__(self, places, types, radius_km=AREA_TYPE_RADIUS_KM):
+        self.places = np.asarray(places, dtype=float).reshape(-1, 2)
+        self.types = np.asarray(types, dtype=object)
+        self.radius_km = radius_km
+
+    @classmethod
+    def load(cls, path=GAZETTEER_PATH, radius_km=AREA_TYPE_RADIUS_KM):
+        """Places with an area_type from a gazetteer CSV; none if it can't be read"""
+        places, types = [], []
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    try:
+                        if row.get('area_type'):
+                            places.append((float(row['lat']), float(row['lng'])))
+                            types.append(row['area_type'])
+                    except (KeyError, TypeError, ValueError):
+                        continue
+        except (OSError, csv.Error) as e:
+            logger.error("Error loading area types from %s: %s", path, e)
+        return cls(places, types, radius_km)
+
+    def at(self, points):
+        """One area type (or None) per (lat, lng) point"""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if not len(self.places):
+            return [None] * len(points)
+        distances = straight_distance_matrix(points, self.places)
+        nearest = distances.argmin(axis=1)
+        within = distances[np.arange(len(points)), nearest] <= self.radius_km
+        return [self.types[index] if ok else None for index, ok in zip(nearest, within)]
+
+_area_types = None
+
+def segment_area_types(points, boundaries):
+    """Area type at the midpoint of each segment"""
+    global _area_types
+    if _area_types is None:
+        _area_types = AreaTypes.load()
+    points = np.asarray(points, dtype=float)
+    return _area_types.at((points[boundaries[:-1]] + points[boundaries[1:]]) / 2)
+
+def traffic_levels(minutes, typical_minutes):
+    """'heavy', 'medium' or 'light' from each predicted/typical time ratio"""
+    ratio = np.asarray(minutes) / np.asarray(typical_minutes)
+    return np.select([ratio > 1.5, ratio > 1.2], ['heavy', 'medium'], default='light')
+
+def score_segments(day_of_week, hour, distances, area_types=None, typical_hour=TRAFFIC_TYPICAL_HOUR):
+    """Current and typical minutes for every segment and the whole route, from one model call
+
+    Each segment is scored with its own length and area type. Segment
+    times are then scaled to add up to the whole-route prediction, so the
+    totals agree with a single prediction for the route and each segment
+    keeps its share of it.
+    """
+    distances = np.asarray(distances, dtype=float)
+    area_types = list(area_types) if area_types is not None else [None] * len(distances)
+    times = predict_distance_profiles(
+        [day_of_week, day_of_week], [hour, typical_hour], np.append(distances, distances.sum()),
+        route_type=area_types + [None], rounded=False
+    )
+    route_times = times[:, -1]
+    segment_times = times[:, :-1] * (route_times / times[:, :-1].sum(axis=1))[:, None]
+    return {
+        'minutes': segment_times[0],
+        'typical_minutes': segment_times[1],
+        'route_minutes': float(route_times[0]),
+        'typical_route_minutes': float(route_times[1])
+    }
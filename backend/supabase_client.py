@@ -1,9 +1,214 @@
-from supabase import create_client, Client
+import logging
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
\ No newline at end of file
+
+# The SDK is slow to import, so it is loaded and the client built on first use
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """The shared anon-key client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from supabase import create_client
+                _client = create_client(url, key)
+    return _client
+
+def __getattr__(name):
+    # Keeps `supabase_client.supabase` working without creating the client at import
+    if name == 'supabase':
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Service-role clients for server-side reads and writes are pooled and reused
+SUPABASE_POOL_SIZE = int(os.environ.get('SUPABASE_POOL_SIZE', 4))
+SUPABASE_POOL_TIMEOUT = float(os.environ.get('SUPABASE_POOL_TIMEOUT', 10.0))
+# Idle connections are kept open this long, so most requests skip the TCP/TLS handshake
+SUPABASE_KEEPALIVE_SECONDS = float(os.environ.get('SUPABASE_KEEPALIVE_SECONDS', 120.0))
+# Clients idle for this long are checked with a one-row query (0 disables the check)
+SUPABASE_HEALTH_INTERVAL = float(os.environ.get('SUPABASE_HEALTH_INTERVAL', 60.0))
+
+class _PooledClient:
+    def __init__(self, client, session):
+        self.client = client
+        self.session = session
+        self.last_used = time.monotonic()
+
+class SupabaseClientPool:
+    """Thread-safe pool of long-lived Supabase clients
+
+    Each client owns an httpx session with keep-alive connections, so
+    requests reuse open TLS connections instead of building a client per
+    call. Borrow one with `with pool.client() as client:`; up to `size`
+    clients are created on demand. A client whose call fails at the
+    transport level is closed and replaced, and a background thread checks
+    clients that have sat idle for health_interval seconds.
+    """
+
+    def __init__(self, url, key, size=4, timeout=10.0, keepalive=120.0, health_interval=60.0,
+                 health_table='predictions'):
+        self.url = url
+        self.key = key
+        self.size = size
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self.health_interval = health_interval
+        self.health_table = health_table
+        # Most recently returned first, so the warmest connections get reused
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._monitor = None
+        self._stop = threading.Event()
+        self._closed = False
+        # Set to httpx.TransportError once a client exists, so httpx isn't imported up front
+        self._transport_errors = ()
+        self._stats = {'borrowed': 0, 'waited': 0, 'created': 0, 'discarded': 0, 'health_checks': 0}
+
+    @contextmanager
+    def client(self):
+        """Borrow a client for the duration of the with block"""
+        pooled = self._acquire()
+        try:
+            yield pooled.client
+        except self._transport_errors:
+            self._discard(pooled, "transport error")
+            pooled = None
+            raise
+        finally:
+            if pooled is not None:
+                self._release(pooled)
+
+    def close(self):
+        """Close idle clients now and borrowed ones as they are returned"""
+        self._closed = True
+        self._stop.set()
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(pooled)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'size': self.size, 'open': self._created, 'idle': self._idle.qsize()}
+
+    def _acquire(self):
+        if self._closed:
+            raise RuntimeError("Supabase client pool is closed")
+        self._start_monitor()
+        self._count('borrowed')
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return self._create()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        self._count('waited')
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RuntimeError("No Supabase client available")
+
+    def _create(self):
+        import httpx
+        from supabase import create_client
+        from supabase.lib.client_options import SyncClientOptions
+        
+        self._transport_errors = httpx.TransportError
+        session = httpx.Client(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=self.keepalive)
+        )
+        options = SyncClientOptions(httpx_client=session, auto_refresh_token=False, persist_session=False)
+        client = create_client(self.url, self.key, options=options)
+        self._count('created')
+        return _PooledClient(client, session)
+
+    def _release(self, pooled):
+        pooled.last_used = time.monotonic()
+        if self._closed:
+            self._discard(pooled)
+        else:
+            self._idle.put(pooled)
+
+    def _discard(self, pooled, reason=None):
+        if reason:
+            logger.warning("Replacing Supabase client: %s", reason)
+        try:
+            pooled.session.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._created -= 1
+            self._stats['discarded'] += 1
+
+    def _start_monitor(self):
+        if self._monitor is not None or self.health_interval <= 0:
+            return
+        with self._lock:
+            if self._monitor is None:
+                self._monitor = threading.Thread(target=self._check_idle, name='supabase-pool-monitor', daemon=True)
+                self._monitor.start()
+
+    def _check_idle(self):
+        while not self._stop.wait(self.health_interval):
+            checked = []
+            while True:
+                try:
+                    pooled = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if time.monotonic() - pooled.last_used < self.health_interval:
+                    checked.append(pooled)
+                    continue
+                self._count('health_checks')
+                try:
+                    pooled.client.table(self.health_table).select('id').limit(1).execute()
+                    pooled.last_used = time.monotonic()
+                    checked.append(pooled)
+                except Exception as e:
+                    self._discard(pooled, f"health check failed: {e}")
+            # Put them back in their original order, warmest on top
+            for pooled in sorted(checked, key=lambda pooled: pooled.last_used):
+                self._release(pooled)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+service_pool = SupabaseClientPool(
+    url,
+    os.environ.get("SUPABASE_SERVICE_KEY"),
+    size=SUPABASE_POOL_SIZE,
+    timeout=SUPABASE_POOL_TIMEOUT,
+    keepalive=SUPABASE_KEEPALIVE_SECONDS,
+    health_interval=SUPABASE_HEALTH_INTERVAL
+)
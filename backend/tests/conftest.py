@@ -0,0 +1,27 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# Modules import each other by name and open models/ and data/ relative to backend/
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+
+# Keep test runs quiet and free of background jobs
+os.environ.update(LOG_FILE='', MODEL_CHECK_INTERVAL='0', ETA_GRID_REFRESH_SECONDS='0', MODEL_PRELOAD='lazy')
+
+@pytest.fixture(scope='session')
+def client():
+    """Flask test client talking to local Mapbox/Supabase stubs"""
+    from benchmarks.stubs import StubServer
+
+    with StubServer(delay=0.0) as server:
+        os.environ.update(server.env())
+        import app
+        yield app.app.test_client()
+
+@pytest.fixture
+def auth_headers():
+    return {'Authorization': f'Bearer test-{uuid.uuid4().hex}'}
@@ -0,0 +1,51 @@
+import pytest
+
+def _trip(**overrides):
+    trip = {
+        'start_point': 'Koramangala, Bangalore',
+        'destination': 'Indiranagar, Bangalore',
+        'day_of_week': 'Monday',
+        'departure_time': '08:30'
+    }
+    trip.update(overrides)
+    return trip
+
+@pytest.mark.parametrize('body', [
+    [],
+    {},
+    {'trips': []},
+    {'trips': 'Koramangala'},
+    {'trips': [None]},
+    {'trips': [_trip(destination='')]},
+    {'trips': [_trip(start_point=12.9)]},
+    {'trips': [_trip(), _trip(destination=['a', 'b'])]},
+    {'trips': [_trip(departure_time='25:00')]},
+    {'trips': [_trip(departure_time='soon')]},
+    {'trips': [_trip()], 'jitter': 'sometimes'},
+    {'trips': [_trip(jitter='sometimes')]}
+])
+def test_predict_batch_rejects_bad_input(client, auth_headers, body):
+    response = client.post('/predict/batch', json=body, headers=auth_headers)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+@pytest.mark.parametrize('data', [None, '{"trips": [', 'trips'])
+def test_predict_batch_rejects_missing_or_invalid_json(client, auth_headers, data):
+    response = client.post('/predict/batch', data=data, content_type='application/json', headers=auth_headers)
+    assert response.status_code == 400
+
+def test_predict_batch_rejects_too_many_trips(client, auth_headers):
+    import app
+    response = client.post('/predict/batch', json={'trips': [_trip()] * (app.MAX_BATCH_SIZE + 1)}, headers=auth_headers)
+    assert response.status_code == 400
+
+def test_predict_batch_requires_a_token(client):
+    assert client.post('/predict/batch', json={'trips': [_trip()]}).status_code == 401
+
+def test_predict_batch_scores_valid_trips(client, auth_headers):
+    response = client.post('/predict/batch', json={'trips': [_trip(), _trip(departure_time='14:00')], 'jitter': 'off'},
+                           headers=auth_headers)
+    assert response.status_code == 200
+    predictions = response.get_json()['predictions']
+    assert len(predictions) == 2
+    assert all(prediction['predicted_time'] > 0 for prediction in predictions)
@@ -0,0 +1,34 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+import model
+from compiled_model import CompiledEnsemble, export_pipeline
+
+@pytest.fixture(scope='module')
+def pipeline():
+    return joblib.load(model.MODEL_PATH)
+
+@pytest.fixture(scope='module')
+def compiled(pipeline):
+    return export_pipeline(pipeline)
+
+def test_compiled_model_matches_pipeline(pipeline, compiled):
+    columns = model._verification_columns()
+    expected = pipeline.predict(pd.DataFrame(columns))
+    assert np.allclose(compiled.predict(columns), expected,
+                       rtol=model.COMPILED_MODEL_RTOL, atol=model.COMPILED_MODEL_ATOL)
+
+def test_compiled_model_accepts_frames_and_columns(compiled):
+    columns = model._verification_columns()
+    assert np.array_equal(compiled.predict(columns), compiled.predict(pd.DataFrame(columns)))
+
+def test_saved_export_predicts_the_same(compiled, tmp_path):
+    path = tmp_path / 'model.compiled.npz'
+    compiled.source_sha256 = 'abc123'
+    compiled.save(path)
+    loaded = CompiledEnsemble.load(path)
+    columns = model._verification_columns()
+    assert loaded.source_sha256 == 'abc123'
+    assert np.array_equal(loaded.predict(columns), compiled.predict(columns))
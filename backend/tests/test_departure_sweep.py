@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import model
+import utils
+
+def _clock(hour):
+    class FixedClock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2024, 1, 15, hour, 0, tzinfo=tz)
+    return FixedClock
+
+def test_sweep_slots_ignore_the_wall_clock(monkeypatch):
+    # A peak slot and an off-peak one, scored as /predict/sweep does
+    trips = [{
+        'start_point': 'Koramangala, Bangalore',
+        'destination': 'Whitefield, Bangalore',
+        'start_coords': (12.9352, 77.6245),
+        'dest_coords': (12.9698, 77.7500),
+        'day_of_week': 'Monday',
+        'departure_time': departure,
+        'jitter': 'seeded',
+        'speed_at_departure': True
+    } for departure in ('08:30', '13:00')]
+
+    results = []
+    for hour in (8, 13, 23):
+        monkeypatch.setattr(model, 'datetime', _clock(hour))
+        monkeypatch.setattr(utils, 'datetime', _clock(hour))
+        results.append(model.predict_travel_times(trips))
+
+    assert results[0] == results[1] == results[2]
+
+def test_detour_only_at_peak_departure_hours():
+    distances = utils.route_distances([(12.9352, 77.6245)] * 2, [(12.9698, 77.7500)] * 2,
+                                      noise=[1.0, 1.0], hours=[8, 13])
+    assert distances[0] > distances[1]
@@ -0,0 +1,28 @@
+import base64
+import json
+
+import pytest
+
+from history import decode_cursor, encode_cursor
+
+def _cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+def test_cursor_round_trip():
+    row = {'created_at': '2024-03-01T08:15:00+00:00', 'id': '0b5f6a2e-8d0c-4d39-9a5e-3c4f1e2a7b61'}
+    assert decode_cursor(encode_cursor(row)) == (row['created_at'], row['id'])
+    assert decode_cursor(encode_cursor({'created_at': row['created_at'], 'id': 42})) == (row['created_at'], 42)
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor',
+    _cursor(['2024-03-01T08:15:00']),
+    _cursor({'created_at': '2024-03-01T08:15:00', 'id': 1}),
+    _cursor(['2024-03-01T08:15:00),or(user_id.neq.x', 1]),
+    _cursor(['2024-03-01T08:15:00', '1),or(user_id.neq.x']),
+    _cursor(['2024-03-01T08:15:00', True]),
+    _cursor(['2024-03-01T08:15:00', 1.5]),
+    _cursor([None, 1])
+])
+def test_rejects_malformed_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
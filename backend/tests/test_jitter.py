@@ -0,0 +1,39 @@
+import numpy as np
+
+import model
+from jitter import NEUTRAL, jitter_draws, seeded_draws
+
+def _trip(start='Koramangala, Bangalore', departure_time='08:30', **extra):
+    return {
+        'start_point': start,
+        'destination': 'Whitefield, Bangalore',
+        'start_coords': (12.9352, 77.6245),
+        'dest_coords': (12.9698, 77.7500),
+        'day_of_week': 'Monday',
+        'departure_time': departure_time,
+        **extra
+    }
+
+def test_seeded_draws_are_a_function_of_key_and_seed():
+    keys = [1, 2, 3]
+    assert np.array_equal(seeded_draws(keys, seed=7), seeded_draws(keys, seed=7))
+    assert not np.array_equal(seeded_draws(keys, seed=7), seeded_draws(keys, seed=8))
+    assert ((seeded_draws(keys) >= 0) & (seeded_draws(keys) < 1)).all()
+
+def test_seeded_jitter_depends_only_on_the_trip():
+    trips = [_trip(), _trip(start='  KORAMANGALA,  Bangalore '), _trip(departure_time='08:40'), _trip(start='Hebbal, Bangalore')]
+    draws = jitter_draws(trips, default_mode='seeded')
+    np.random.seed(0)
+    assert np.array_equal(draws, jitter_draws(trips, default_mode='seeded'))
+    # Same normalized address and time bucket share draws; another route doesn't
+    assert np.array_equal(draws[0], draws[1])
+    assert np.array_equal(draws[0], draws[2])
+    assert not np.array_equal(draws[0], draws[3])
+
+def test_off_mode_is_neutral():
+    assert np.array_equal(jitter_draws([_trip(jitter='off')]), [NEUTRAL])
+
+def test_seeded_predictions_repeat():
+    trips = [_trip(jitter='seeded'), _trip(departure_time='18:00', jitter='seeded')]
+    first = model.predict_travel_times(trips)
+    assert all(model.predict_travel_times(trips) == first for _ in range(3))
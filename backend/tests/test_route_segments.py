@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+from route_segments import decode_polyline, encode_polyline
+
+def test_polyline_round_trip():
+    points = np.array([(12.97194, 77.59369), (12.93524, 77.62448), (-33.86785, 151.20732), (0.0, -0.00001)])
+    assert np.allclose(decode_polyline(encode_polyline(points)), points)
+
+def test_decodes_the_reference_polyline():
+    # Example from Google's encoded polyline algorithm documentation
+    points = decode_polyline('_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+    assert np.allclose(points, [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)])
+    assert encode_polyline(points) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+
+@pytest.mark.parametrize('encoded', ['', '_p~iF', '_p~iF~ps|U_', 'abc\x7f', '\x1f'])
+def test_rejects_malformed_polylines(encoded):
+    with pytest.raises(ValueError):
+        decode_polyline(encoded)
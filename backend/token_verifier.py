@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+try:
+    import jwt
+except ImportError:  # Listed in requirements.txt; without it every token goes through the cache
+    jwt = None
+
+logger = logging.getLogger(__name__)
+
+def _unverified_claims(token):
+    """Decode a JWT payload without checking the signature"""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload))
+    except Exception:
+        return {}
+
+def _user_from_claims(claims):
+    """Build an object shaped like supabase's UserResponse from JWT claims"""
+    return SimpleNamespace(user=SimpleNamespace(
+        id=claims.get('sub'),
+        email=claims.get('email'),
+        role=claims.get('role'),
+        app_metadata=claims.get('app_metadata', {}),
+        user_metadata=claims.get('user_metadata', {})
+    ))
+
+class TokenVerifier:
+    """Verifies access tokens locally or through a cached remote lookup
+
+    With a JWT secret (HS256) or a JWKS URL and PyJWT installed, tokens are
+    validated in-process. Otherwise successful fetch_user results are cached
+    by token hash until the token expires, capped at max_ttl seconds.
+    """
+
+    def __init__(self, fetch_user, jwt_secret=None, jwks_url=None, audience='authenticated',
+                 max_entries=10000, max_ttl=300):
+        self.fetch_user = fetch_user
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._jwks_client = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'local': 0, 'rejected': 0}
+
+        if (jwt_secret or jwks_url) and jwt is None:
+            # Local verification was asked for, so running without it is a deployment error
+            logger.error("SUPABASE_JWT_SECRET/SUPABASE_JWKS_URL is set but PyJWT is not installed "
+                         "(pip install 'PyJWT[crypto]'); falling back to cached remote token checks")
+        elif jwks_url:
+            self._jwks_client = jwt.PyJWKClient(jwks_url, cache_keys=True)
+
+    @property
+    def local(self):
+        return jwt is not None and bool(self.jwt_secret or self._jwks_client)
+
+    def verify(self, token):
+        """Return the user for a valid token, or None if it is invalid"""
+        if self.local:
+            return self._verify_locally(token)
+
+        user = self.cached(token)
+        if user is not None:
+            return user
+
+        user = self.fetch_user(token)
+        if not user:
+            self._count('rejected')
+            return None
+
+        self.store(token, user)
+        return user
+
+    def cached(self, token):
+        """Return the cached user for a token, or None on a miss"""
+        key = hashlib.sha256(token.encode()).hexdigest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[1]
+            self._entries.pop(key, None)
+            self._stats['misses'] += 1
+            return None
+
+    def store(self, token, user):
+        """Cache a user looked up elsewhere until the token expires"""
+        now = time.time()
+        expires_at = _unverified_claims(token).get('exp', now + self.max_ttl)
+        expires_at = min(expires_at, now + self.max_ttl)
+        if expires_at <= now:
+            return
+
+        key = hashlib.sha256(token.encode()).hexdigest()
+        with self._lock:
+            self._entries[key] = (expires_at, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'size': len(self._entries),
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'mode': 'local' if self.local else 'cached'
+            }
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _verify_locally(self, token):
+        try:
+            if self._jwks_client is not None:
+                signing_key = self._jwks_client.get_signing_key_from_jwt(token).key
+                claims = jwt.decode(token, signing_key, algorithms=['RS256', 'ES256'], audience=self.audience)
+            else:
+                claims = jwt.decode(token, self.jwt_secret, algorithms=['HS256'], audience=self.audience)
+        except jwt.PyJWTError as e:
+            logger.warning(f"Rejected access token: {str(e)}")
+            self._count('rejected')
+            return None
+
+        self._count('local')
+        return _user_from_claims(claims)
@@ -0,0 +1,108 @@
+import json
+import logging
+import queue
+import threading
+
+from geocoding import normalize_address
+
+logger = logging.getLogger(__name__)
+
+def format_event(payload, status=200):
+    """Format a traffic payload as a Server-Sent Event"""
+    event = 'traffic' if status == 200 else 'traffic_error'
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+class TrafficBroadcaster:
+    """Pushes live traffic for subscribed routes to every subscriber
+
+    A single background thread recomputes each route that has at least one
+    subscriber once per interval and fans the result out to the subscribers'
+    queues. Slow subscribers only ever hold the most recent updates.
+    """
+
+    def __init__(self, compute, interval=60, max_pending=2):
+        self.compute = compute
+        self.interval = interval
+        self.max_pending = max_pending
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._stats = {'ticks': 0, 'computations': 0, 'pushes': 0}
+
+    def subscribe(self, start, destination, updates=None):
+        """Register a subscriber and return (key, queue) of (payload, status) updates
+
+        updates may be any object with queue.Queue's put_nowait/get_nowait;
+        a bounded queue.Queue is created if omitted.
+        """
+        key = (normalize_address(start), normalize_address(destination))
+        if updates is None:
+            updates = queue.Queue(maxsize=self.max_pending)
+        with self._lock:
+            route = self._routes.setdefault(key, {
+                'start': start,
+                'destination': destination,
+                'subscribers': set()
+            })
+            route['subscribers'].add(updates)
+        self.start()
+        return key, updates
+
+    def unsubscribe(self, key, updates):
+        with self._lock:
+            route = self._routes.get(key)
+            if route is None:
+                return
+            route['subscribers'].discard(updates)
+            if not route['subscribers']:
+                del self._routes[key]
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='traffic-broadcaster', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                'routes': len(self._routes),
+                'subscribers': sum(len(route['subscribers']) for route in self._routes.values())
+            }
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                routes = [(route['start'], route['destination'], list(route['subscribers']))
+                          for route in self._routes.values()]
+                self._stats['ticks'] += 1
+
+            for start, destination, subscribers in routes:
+                try:
+                    result = self.compute(start, destination)
+                except Exception as e:
+                    logger.error(f"Error computing traffic for {start} -> {destination}: {str(e)}")
+                    result = ({'error': str(e)}, 500)
+
+                with self._lock:
+                    self._stats['computations'] += 1
+                    self._stats['pushes'] += len(subscribers)
+                for updates in subscribers:
+                    self._push(updates, result)
+
+    def _push(self, updates, result):
+        # Drop the oldest pending update rather than blocking on a slow client
+        while True:
+            try:
+                updates.put_nowait(result)
+                return
+            except queue.Full:
+                try:
+                    updates.get_nowait()
+                except queue.Empty:
+                    pass
@@ -1,84 +1,108 @@
-import math
 import logging
-import pandas as pd
 import numpy as np
 from datetime import datetime
+from feature_table import road_complexity, average_speeds
+from logging_config import configure_logging, detail_enabled
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='model_predictions.log'
-)
+# Log through the shared non-blocking, rotating pipeline
+configure_logging()
 logger = logging.getLogger(__name__)
 
 def calculate_road_complexity(distance, area_type=None):
     """Calculate road complexity factor based on distance and area type"""
     try:
-        # Base complexity (roads are never straight)
-        base_factor = 1.2
-        
-        # Distance-based complexity
-        if distance < 5:  # Short urban routes have more turns
-            complexity = base_factor + 0.3
-        elif distance < 10:
-            complexity = base_factor + 0.25
-        elif distance < 15:
-            complexity = base_factor + 0.2
-        else:  # Longer routes tend to use highways more
-            complexity = base_factor + 0.15
-            
-        # Area-based adjustments
-        area_factors = {
-            'IT Hub': 1.1,  # More direct routes
-            'Commercial': 1.2,  # More intersections
-            'Residential': 1.25,  # More turns and small roads
-            'Mixed': 1.15  # Moderate complexity
-        }
-        
-        if area_type:
-            complexity *= area_factors.get(area_type, 1.0)
-            
-        return complexity
+        return float(road_complexity([distance], [area_type])[0])
     except Exception as e:
         logger.error(f"Error calculating road complexity: {str(e)}")
         return 1.2
 
+EARTH_RADIUS_KM = 6371  # Earth's radius in kilometers
+
+def _haversine(lat1, lon1, lat2, lon2):
+    """Straight-line distance in km; arguments broadcast like NumPy arrays"""
+    # Convert coordinates to radians
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+    
+    # Haversine formula for straight-line distance
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    return 2 * np.arcsin(np.sqrt(a)) * EARTH_RADIUS_KM
+
+def _road_distances(straight_distances, area_types, noise=None, hours=None):
+    """Turn straight-line distances into real-world road distances
+    
+    noise holds uniform [0, 1) draws shaped like the distances for the
+    peak-hour detour; fresh draws are used if omitted. hours is the hour
+    of day (one, or one per distance) that decides whether the detour
+    applies, defaulting to the current hour.
+    """
+    straight_distances = np.round(straight_distances, 2)
+    
+    # Apply road complexity factor
+    real_distances = straight_distances * road_complexity(straight_distances, area_types)
+    
+    # Add micro-variations based on time of day
+    hours = np.broadcast_to(datetime.now().hour if hours is None else np.asarray(hours), real_distances.shape)
+    peak = ((hours >= 7) & (hours <= 10)) | ((hours >= 16) & (hours <= 19))  # Peak hours
+    if peak.any():
+        # During peak hours, drivers might take alternate routes
+        noise = np.random.random(real_distances.shape) if noise is None else np.asarray(noise, dtype=float)
+        real_distances = np.where(peak, real_distances * (1 + (noise * 0.15)), real_distances)
+    
+    return np.round(real_distances, 2)
+
+def _area_type_grid(area_types, shape):
+    """Broadcast per-origin (or per-pair) area types to a distance array's shape"""
+    area_types = np.asarray(area_types, dtype=object)
+    if area_types.ndim == 1 and len(shape) == 2:
+        area_types = area_types[:, None]
+    return np.broadcast_to(area_types, shape)
+
+def route_distances(origins, destinations, area_types=None, noise=None, hours=None):
+    """Road distances in km between paired (lat, lon) origins and destinations, at hours (default now)"""
+    origins = np.asarray(origins, dtype=float).reshape(-1, 2)
+    destinations = np.asarray(destinations, dtype=float).reshape(-1, 2)
+    straight = _haversine(origins[:, 0], origins[:, 1], destinations[:, 0], destinations[:, 1])
+    return _road_distances(straight, _area_type_grid(area_types, straight.shape), noise, hours)
+
+def distance_matrix(origins, destinations, area_types=None, noise=None):
+    """Road distances in km from every (lat, lon) origin to every destination
+    
+    area_types may be a single type, one per origin, or an N x M array.
+    Returns an N x M array.
+    """
+    straight = straight_distance_matrix(origins, destinations)
+    return _road_distances(straight, _area_type_grid(area_types, straight.shape), noise)
+
+def straight_distance_matrix(origins, destinations):
+    """Straight-line km from every (lat, lon) origin to every destination, as an N x M array"""
+    origins = np.asarray(origins, dtype=float).reshape(-1, 2)
+    destinations = np.asarray(destinations, dtype=float).reshape(-1, 2)
+    return _haversine(origins[:, 0, None], origins[:, 1, None], destinations[None, :, 0], destinations[None, :, 1])
+
+def path_distances(points):
+    """Straight-line km between consecutive (lat, lon) points of a path"""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    return _haversine(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])
+
+def is_coordinate(point):
+    """Check whether a value is a (lat, lon) pair rather than an address"""
+    return isinstance(point, (tuple, list)) and len(point) == 2 and \
+        all(isinstance(value, (int, float)) for value in point)
+
 def calculate_distance(start_point, destination, area_type=None):
     """Calculate distance between points with improved real-world adjustments"""
     try:
-        if not isinstance(start_point, tuple) or not isinstance(destination, tuple):
+        if not is_coordinate(start_point) or not is_coordinate(destination):
             logger.warning("Invalid coordinate format. Using fallback distance.")
             return 10.0
         
-        lat1, lon1 = start_point
-        lat2, lon2 = destination
-        
-        # Convert coordinates to radians
-        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-        
-        # Haversine formula for straight-line distance
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        r = 6371  # Earth's radius in kilometers
-        straight_distance = round(c * r, 2)
+        real_distance = float(route_distances([start_point], [destination], [area_type])[0])
         
-        # Calculate road complexity factor
-        complexity = calculate_road_complexity(straight_distance, area_type)
-        
-        # Apply complexity factor
-        real_distance = straight_distance * complexity
-        
-        # Add micro-variations based on time of day
-        hour = datetime.now().hour
-        if 7 <= hour <= 10 or 16 <= hour <= 19:  # Peak hours
-            # During peak hours, drivers might take alternate routes
-            real_distance *= (1 + (np.random.random() * 0.15))
-        
-        logger.info(f"Calculated distance: {real_distance:.2f} km (straight: {straight_distance:.2f} km)")
-        return round(real_distance, 2)
+        if detail_enabled(logger):
+            logger.debug("Calculated distance: %.2f km", real_distance, extra={'distance_km': real_distance})
+        return real_distance
     except Exception as e:
         logger.error(f"Error calculating distance: {str(e)}")
         return 10.0
@@ -86,73 +110,14 @@ def calculate_distance(start_point, destination, area_type=None):
 def calculate_average_speed(traffic_multiplier, route_type=None, distance=None):
     """Calculate average speed with distance-based adjustments"""
     try:
-        # Base speeds adjusted for different route lengths
-        short_distance_speeds = {
-            'IT Hub': 22,
-            'Commercial': 25,
-            'Mixed': 23,
-            'Residential': 30
-        }
-        
-        medium_distance_speeds = {
-            'IT Hub': 28,
-            'Commercial': 32,
-            'Mixed': 30,
-            'Residential': 35
-        }
-        
-        long_distance_speeds = {
-            'IT Hub': 35,
-            'Commercial': 40,
-            'Mixed': 38,
-            'Residential': 45
-        }
-        
-        # Select speed table based on distance
-        if distance is None:
-            speed_table = medium_distance_speeds
-        elif distance < 5:
-            speed_table = short_distance_speeds
-        elif distance < 15:
-            speed_table = medium_distance_speeds
-        else:
-            speed_table = long_distance_speeds
-        
-        # Get base speed for route type
-        base_speed = speed_table.get(route_type, 30)
-        
-        # Apply traffic multiplier
-        speed = base_speed / traffic_multiplier
-        
-        # Speed bounds based on distance
-        if distance is not None:
-            if distance < 5:
-                min_speed, max_speed = 10, 40
-            elif distance < 15:
-                min_speed, max_speed = 15, 50
-            else:
-                min_speed, max_speed = 20, 60
-        else:
-            min_speed, max_speed = 15, 50
-        
-        # Time-based adjustments
-        hour = datetime.now().hour
-        if hour >= 22 or hour <= 5:  # Night time
-            speed *= 1.3
-            max_speed *= 1.2
-        elif hour in [7, 8, 9, 17, 18, 19]:  # Peak hours
-            speed *= 0.7
-            max_speed *= 0.8
-        
-        # Weather impact (simplified - could be expanded with real weather data)
-        weather_factor = 1.0 + (np.random.random() * 0.1 - 0.05)
-        speed *= weather_factor
-        
-        # Final bounds check
-        final_speed = max(min_speed, min(speed, max_speed))
-        
-        logger.info(f"Calculated speed: {final_speed:.2f} km/h for {route_type} route ({distance if distance else 'unknown'} km)")
-        return round(final_speed, 2)
+        final_speed = float(average_speeds(
+            [traffic_multiplier], [route_type], [distance if distance is not None else np.nan], datetime.now().hour
+        )[0])
+        
+        if detail_enabled(logger):
+            logger.debug("Calculated speed: %.2f km/h for %s route (%s km)", final_speed, route_type,
+                         distance if distance else 'unknown', extra={'speed_kmh': final_speed, 'route_type': route_type})
+        return final_speed
     except Exception as e:
         logger.error(f"Error calculating speed: {str(e)}")
-        return 25  # Default fallback speed 
\ No newline at end of file
+        return 25  # Default fallback speed